@@ -1,21 +1,15 @@
 from argparse import ArgumentParser, Namespace
 from typing import Sequence, Tuple
 
-from .cake.main import main as cake_main
-from .domains.main import main as domains_main
-from .ifup.main import main as ifup_main
-from .nat64.main import main as nat_main
-from .stats.main import main as stats_main
-from .template.main import main as template_main
-from .wireguard.main import main as wg_main
-
 
 def _parse_args() -> Tuple[Namespace, Sequence[str]]:
     parser = ArgumentParser()
     parser.add_argument(
         "op",
         choices=(
+            "boot",
             "cake",
+            "dhcp",
             "domains",
             "ifup",
             "nat64",
@@ -30,19 +24,41 @@ def _parse_args() -> Tuple[Namespace, Sequence[str]]:
 def main() -> None:
     args, argv = _parse_args()
 
-    if args.op == "ifup":
+    if args.op == "boot":
+        from .boot.main import main as boot_main
+
+        boot_main()
+    elif args.op == "ifup":
+        from .ifup.main import main as ifup_main
+
         ifup_main()
     elif args.op == "cake":
+        from .cake.main import main as cake_main
+
         cake_main()
+    elif args.op == "dhcp":
+        from .dhcp.main import main as dhcp_main
+
+        dhcp_main()
     elif args.op == "domains":
+        from .domains.main import main as domains_main
+
         domains_main(argv)
     elif args.op == "stats":
+        from .stats.main import main as stats_main
+
         stats_main()
     elif args.op == "template":
+        from .template.main import main as template_main
+
         template_main()
     elif args.op == "wg":
-        wg_main()
+        from .wireguard.main import main as wg_main
+
+        wg_main(argv)
     elif args.op == "nat64":
+        from .nat64.main import main as nat_main
+
         nat_main()
     else:
         assert False, (args, argv)
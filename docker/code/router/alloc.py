@@ -0,0 +1,127 @@
+from bisect import bisect_left, bisect_right
+from ipaddress import IPv4Network, ip_address
+from typing import MutableSequence, Optional, Tuple, Union
+
+from std2.ipaddress import IPAddress, IPNetwork
+
+
+def _host_range(network: IPNetwork) -> Tuple[int, int]:
+    last = network.num_addresses - 1
+    if network.prefixlen >= network.max_prefixlen - 1:
+        return 0, last
+    elif isinstance(network, IPv4Network):
+        return 1, last - 1
+    else:
+        return 1, last
+
+
+class Bitmap:
+    def __init__(self, network: IPNetwork) -> None:
+        self._network = network
+        self._base = int(network.network_address)
+        lo, hi = _host_range(network)
+        self._hosts = ((1 << (hi + 1)) - 1) ^ ((1 << lo) - 1)
+        self._used = 0
+
+    def reserve(self, addr: IPAddress) -> None:
+        if addr in self._network:
+            self._used |= 1 << (int(addr) - self._base)
+
+    def free(self, addr: IPAddress) -> bool:
+        if addr in self._network:
+            bit = 1 << (int(addr) - self._base)
+            return bool(self._hosts & ~self._used & bit)
+        else:
+            return False
+
+    def probe(self, start: IPAddress) -> IPAddress:
+        free = self._hosts & ~self._used
+        if not free:
+            raise ValueError(f"NO FREE ADDRESS - {self._network}")
+        else:
+            offset = int(start) - self._base if start in self._network else 0
+            bits = free >> offset << offset or free
+            idx = (bits & -bits).bit_length() - 1
+            return ip_address(self._base + idx)
+
+    def first(self) -> IPAddress:
+        return self.probe(self._network.network_address)
+
+
+class Intervals:
+    def __init__(self, network: IPNetwork) -> None:
+        self._network = network
+        self._base = int(network.network_address)
+        lo, hi = _host_range(network)
+        self._starts: MutableSequence[int] = [lo]
+        self._ends: MutableSequence[int] = [hi]
+
+    def _find(self, idx: int) -> int:
+        pos = bisect_right(self._starts, idx) - 1
+        return pos if pos >= 0 and idx <= self._ends[pos] else -1
+
+    def reserve(self, addr: IPAddress) -> None:
+        if addr in self._network:
+            idx = int(addr) - self._base
+            if (pos := self._find(idx)) >= 0:
+                start, end = self._starts[pos], self._ends[pos]
+                del self._starts[pos], self._ends[pos]
+                if idx < end:
+                    self._starts.insert(pos, idx + 1)
+                    self._ends.insert(pos, end)
+                if start < idx:
+                    self._starts.insert(pos, start)
+                    self._ends.insert(pos, idx - 1)
+
+    def free(self, addr: IPAddress) -> bool:
+        return addr in self._network and self._find(int(addr) - self._base) >= 0
+
+    def probe(self, start: IPAddress) -> IPAddress:
+        if not self._starts:
+            raise ValueError(f"NO FREE ADDRESS - {self._network}")
+        else:
+            idx = int(start) - self._base if start in self._network else 0
+            if self._find(idx) >= 0:
+                return ip_address(self._base + idx)
+            else:
+                pos = bisect_right(self._starts, idx)
+                nxt = self._starts[pos] if pos < len(self._starts) else self._starts[0]
+                return ip_address(self._base + nxt)
+
+    def first(self) -> IPAddress:
+        return self.probe(self._network.network_address)
+
+
+class Spans:
+    def __init__(self) -> None:
+        self._starts: MutableSequence[int] = []
+        self._ends: MutableSequence[int] = []
+
+    def add(self, network: IPNetwork) -> None:
+        lo, hi = int(network.network_address), int(network.broadcast_address)
+        i = bisect_left(self._ends, lo - 1)
+        j = bisect_right(self._starts, hi + 1)
+        if i < j:
+            lo, hi = min(lo, self._starts[i]), max(hi, self._ends[j - 1])
+        self._starts[i:j] = [lo]
+        self._ends[i:j] = [hi]
+
+    def first_fit(self, block: IPNetwork, prefixlen: int) -> Optional[IPNetwork]:
+        new_prefix = max(block.prefixlen, prefixlen)
+        size = 1 << (block.max_prefixlen - new_prefix)
+        start, last = int(block.network_address), int(block.broadcast_address)
+        while start + size - 1 <= last:
+            pos = bisect_right(self._starts, start + size - 1) - 1
+            if pos >= 0 and self._ends[pos] >= start:
+                start = -(-(self._ends[pos] + 1) // size) * size
+            else:
+                return type(block)((start, new_prefix))
+        else:
+            return None
+
+
+Allocator = Union[Bitmap, Intervals]
+
+
+def allocator(network: IPNetwork) -> Allocator:
+    return Bitmap(network) if isinstance(network, IPv4Network) else Intervals(network)
@@ -0,0 +1,29 @@
+from os import linesep
+from re import compile
+from shlex import join
+from subprocess import run
+from typing import Iterable, Sequence
+
+Cmd = Sequence[str]
+
+_FAILED = compile(r"Command failed -:(\d+)")
+
+
+def batch(prog: str, cmds: Iterable[Cmd]) -> None:
+    lines = tuple(map(join, cmds))
+    if lines:
+        proc = run(
+            (prog, "-force", "-batch", "-"),
+            input=linesep.join(lines) + linesep,
+            text=True,
+            capture_output=True,
+        )
+        if proc.returncode:
+            failed = sorted({int(m.group(1)) for m in _FAILED.finditer(proc.stderr)})
+            errs = (
+                f"{prog} -batch -:{lineno} :: {lines[lineno - 1]}"
+                for lineno in failed
+                if 0 < lineno <= len(lines)
+            )
+            msg = linesep.join((*errs, proc.stderr.rstrip()))
+            raise RuntimeError(msg)
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from sys import stderr
+from time import perf_counter
+from typing import Any, Callable
+
+from ..cake.main import main as cake_main
+from ..ifup.main import up as ifup_up
+from ..nat64.main import main as nat_main
+from ..subnets import current_networks
+from ..template.main import gen_keys, pprn, render
+from ..types import Networks
+from ..wg import gen_wg
+from ..wireguard.main import up as wg_up
+
+
+def _stage(name: str, thunk: Callable[[], Any]) -> None:
+    t0 = perf_counter()
+    thunk()
+    print(f"{name} :: {perf_counter() - t0:.3f}s", file=stderr)
+
+
+def _links(networks: Networks) -> None:
+    _stage("ifup", partial(ifup_up, networks))
+    _stage("nat64", nat_main)
+    _stage("wg", partial(wg_up, networks))
+
+
+def main() -> None:
+    t0 = perf_counter()
+    pprn()
+    networks = current_networks()
+    _stage("template", partial(render, networks))
+
+    with ThreadPoolExecutor() as pool:
+        futs = (
+            pool.submit(_links, networks),
+            pool.submit(_stage, "cake", cake_main),
+            pool.submit(_stage, "qr", partial(gen_wg, networks)),
+            pool.submit(_stage, "tls", partial(gen_keys, networks)),
+        )
+        for fut in as_completed(futs):
+            fut.result()
+
+    print(f"boot :: {perf_counter() - t0:.3f}s", file=stderr)
@@ -1,83 +1,60 @@
-from subprocess import check_call
+from functools import cache
+from typing import Iterator, Sequence
 
-from ..ip import link_show
+from ..batch import Cmd, batch
+from ..ip import invalidate, link_show
 from ..options.parser import settings
 
-TC_IFB = f"ifb4{settings().interfaces.wan}"
 
-_RX_OPTS = (
-    "ingress",
-    "nat",
-    "dual-dsthost",
-    *settings().traffic_control.receive,
-)
+@cache
+def tc_ifb() -> str:
+    return f"ifb4{settings().interfaces.wan}"
 
-_TX_OPTS = (
-    "egress",
-    "nat",
-    "dual-srchost",
-    *settings().traffic_control.transmit,
-)
 
+def _rx_opts() -> Sequence[str]:
+    return ("ingress", "nat", "dual-dsthost", *settings().traffic_control.receive)
 
-_QDISC_ID = "ffff:"
 
+def _tx_opts() -> Sequence[str]:
+    return ("egress", "nat", "dual-srchost", *settings().traffic_control.transmit)
 
-def _tx(wan_if: str) -> None:
-    check_call(
-        (
-            "tc",
-            "qdisc",
-            "replace",
-            "dev",
-            wan_if,
-            "root",
-            "cake",
-            *_TX_OPTS,
-        )
-    )
 
+_QDISC_ID = "ffff:"
 
-def _rx(wan_if: str) -> None:
-    if TC_IFB not in link_show("ifb"):
-        check_call(("ip", "link", "add", TC_IFB, "type", "ifb"))
 
-    check_call(
-        ("tc", "qdisc", "replace", "dev", wan_if, "handle", _QDISC_ID, "ingress")
-    )
-    check_call(
-        (
-            "tc",
-            "qdisc",
-            "replace",
-            "dev",
-            TC_IFB,
-            "root",
-            "cake",
-            *_RX_OPTS,
-        )
-    )
-    check_call(("ip", "link", "set", "up", "dev", TC_IFB))
-    check_call(
-        (
-            "tc",
-            "filter",
-            "replace",
-            "dev",
-            wan_if,
-            "parent",
-            _QDISC_ID,
-            "matchall",
-            "action",
-            "mirred",
-            "egress",
-            "redirect",
-            "dev",
-            TC_IFB,
-        )
+def _tx(wan_if: str) -> Iterator[Cmd]:
+    yield "qdisc", "replace", "dev", wan_if, "root", "cake", *_tx_opts()
+
+
+def _ifb() -> Iterator[Cmd]:
+    if tc_ifb() not in link_show("ifb"):
+        yield "link", "add", tc_ifb(), "type", "ifb"
+    yield "link", "set", "up", "dev", tc_ifb()
+
+
+def _rx(wan_if: str) -> Iterator[Cmd]:
+    yield "qdisc", "replace", "dev", wan_if, "handle", _QDISC_ID, "ingress"
+    yield "qdisc", "replace", "dev", tc_ifb(), "root", "cake", *_rx_opts()
+    yield (
+        "filter",
+        "replace",
+        "dev",
+        wan_if,
+        "parent",
+        _QDISC_ID,
+        "matchall",
+        "action",
+        "mirred",
+        "egress",
+        "redirect",
+        "dev",
+        tc_ifb(),
     )
 
 
 def main() -> None:
-    _tx(settings().interfaces.wan)
-    _rx(settings().interfaces.wan)
+    wan_if = settings().interfaces.wan
+    batch("ip", cmds=_ifb())
+    invalidate()
+
+    batch("tc", cmds=(*_tx(wan_if), *_rx(wan_if)))
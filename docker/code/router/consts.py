@@ -1,6 +1,8 @@
+from functools import cache
 from os import environ, sep
 from pathlib import Path
 from socket import getfqdn
+from typing import Sequence
 
 from std2.ipaddress import (
     LINK_LOCAL_V4,
@@ -12,7 +14,6 @@ from std2.ipaddress import (
 )
 
 USER = environ["USER"]
-SERVER_NAME = getfqdn()
 
 SHORT_DURATION = 1
 PRIVATE_ADDRS = (
@@ -40,14 +41,30 @@ _TMP = Path(sep) / "tmp"
 
 
 NETWORKS_JSON = _SRV / "run" / "networks" / "networks.json"
+FORWARDS_JSON = RUN / "forwards" / "forwards.json"
+SETTINGS_CACHE = RUN / "settings" / "settings.json"
+RENDERED_JSON = RUN / "rendered" / "rendered.json"
 IPV6_JSON = _TMP / "ipv6.json"
+DOMAINS_SOCK = _TMP / "domains.sock"
 
-UNBOUND_CTL = RUN / "unbound" / "ctl.sh"
+UNBOUND_SOCK = _TMP / "unbound.sock"
+UNBOUND_PID = _TMP / "unbound.pid"
 QR_DIR = RUN / "qr"
 DHCP_SERVER_LEASES = DATA / "dnsmasq" / "leases"
 
 
 NTP_SOURCES = CONFIG / "ntpsources"
-PTP_DEVICES = tuple(dev.is_char_device() for dev in (Path(sep) / "dev").glob("ptp*"))
+
+
+@cache
+def server_name() -> str:
+    return getfqdn()
+
+
+@cache
+def ptp_devices() -> Sequence[Path]:
+    devs = (Path(sep) / "dev").glob("ptp*")
+    return tuple(dev for dev in devs if dev.is_char_device())
+
 
 TUNNABLE = False
@@ -0,0 +1,71 @@
+from hashlib import sha256
+from itertools import chain
+from os import sep
+from pathlib import Path
+from subprocess import check_call
+from sys import stderr
+from typing import Iterable
+
+from ..consts import RUN, SHORT_DURATION
+from ..inotify import Inotify, Mask
+
+_DNSMASQ = RUN / "dnsmasq"
+_SVC = Path(sep) / "run" / "s6" / "legacy-services" / "dnsmasq-dhcp"
+
+_RELOAD = (
+    _DNSMASQ / "dhcp" / "dhcp-hostsdir",
+    _DNSMASQ / "dhcp" / "dhcp-optsdir",
+)
+_RESTART = (
+    _DNSMASQ / "0-base.conf",
+    _DNSMASQ / "dhcp" / "conf.d",
+)
+
+_MASK = (
+    Mask.CLOSE_WRITE
+    | Mask.MOVED_TO
+    | Mask.MOVED_FROM
+    | Mask.CREATE
+    | Mask.DELETE
+    | Mask.DELETE_SELF
+    | Mask.MOVE_SELF
+)
+
+
+def _fingerprint(roots: Iterable[Path]) -> str:
+    hashed = sha256()
+    for root in roots:
+        paths = sorted(root.rglob("*")) if root.is_dir() else (root,)
+        for path in paths:
+            if path.is_file():
+                hashed.update(str(path).encode())
+                hashed.update(b"\0")
+                hashed.update(path.read_bytes())
+    return hashed.hexdigest()
+
+
+def _svc(flag: str) -> None:
+    check_call(("s6-svc", flag, _SVC))
+
+
+def main() -> None:
+    reload, restart = _fingerprint(_RELOAD), _fingerprint(_RESTART)
+
+    with Inotify() as inotify:
+        while True:
+            for path in chain(_RELOAD, _RESTART):
+                if path.exists():
+                    inotify.watch(path, mask=_MASK)
+
+            inotify.read(None)
+            while inotify.read(SHORT_DURATION):
+                pass
+
+            if (fp := _fingerprint(_RESTART)) != restart:
+                restart, reload = fp, _fingerprint(_RELOAD)
+                print("RESTART", "--", _SVC, file=stderr)
+                _svc("-t")
+            elif (fp := _fingerprint(_RELOAD)) != reload:
+                reload = fp
+                print("RELOAD", "--", _SVC, file=stderr)
+                _svc("-h")
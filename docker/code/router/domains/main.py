@@ -1,75 +1,191 @@
 from argparse import ArgumentParser, Namespace
 from ipaddress import IPv4Address, ip_address
-from os import environ, linesep
+from socketserver import StreamRequestHandler, UnixStreamServer
 from string import Template
-from subprocess import run
 from sys import stderr
-from typing import Sequence, Tuple
+from time import monotonic
+from traceback import print_exc
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    MutableSet,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
 
 from std2.ipaddress import IPAddress
 
-from ..consts import SHORT_DURATION, UNBOUND_CTL
+from ..consts import DOMAINS_SOCK, UNBOUND_PID
+from ..leases import leases
 from ..options.parser import encode_dns_name, settings
+from ..prefixes import Role, classify
 from ..subnets import load_networks
+from ..types import Networks
+from ..unbound import ctl
+
+_Lease = Tuple[str, IPAddress]
+_Record = Tuple[str, str, str]
+_Apply = Callable[[Iterable[_Lease]], None]
 
+_RECONCILE_INTERVAL = 60
+_ACK, _NAK = b"0", b"1"
 _ZONE_TYPE = "redirect"
 _LOCAL_ZONE = Template("$HOSTNAME.$DOMAIN.")
-_LOCAL_DATA_PTR = Template(
-    f"$RDDA. {settings().dns.local_ttl} IN PTR $HOSTNAME.$DOMAIN."
-)
-_LOCAL_DATA_A = Template(f"$HOSTNAME.$DOMAIN. {settings().dns.local_ttl} IN A $ADDR")
-_LOCAL_DATA_AAAA = Template(
-    f"$HOSTNAME.$DOMAIN. {settings().dns.local_ttl} IN AAAA $ADDR"
-)
+_LOCAL_DATA_PTR = Template("$RDDA. $TTL IN PTR $HOSTNAME.$DOMAIN.")
+_LOCAL_DATA_A = Template("$HOSTNAME.$DOMAIN. $TTL IN A $ADDR")
+_LOCAL_DATA_AAAA = Template("$HOSTNAME.$DOMAIN. $TTL IN AAAA $ADDR")
 
 
-def _domain(addr: IPAddress) -> str:
-    networks = load_networks()
-    if addr in networks.trusted.v4 or addr in networks.trusted.v6:
-        return settings().dns.local_domains.trusted
-    elif addr in networks.guest.v4 or addr in networks.guest.v6:
-        return settings().dns.local_domains.guest
+def _domain(networks: Networks, addr: IPAddress) -> Optional[str]:
+    label = classify(networks, addr=addr)
+    if label and label.role in {Role.trusted, Role.guest} and label.domain:
+        return label.domain
     else:
-        assert False, addr
+        return None
 
 
-def _parse(hostname: str, addr: IPAddress) -> Tuple[str, str, str]:
+def _parse(networks: Networks, hostname: str, addr: IPAddress) -> Optional[_Record]:
+    if not (domain := _domain(networks, addr=addr)):
+        print("SKIP", "--", hostname, addr, file=stderr)
+        return None
+
     hostname = encode_dns_name(hostname)
-    domain = _domain(addr)
+    ttl = settings().dns.local_ttl
     zone = _LOCAL_ZONE.substitute(DOMAIN=domain, HOSTNAME=hostname)
     ptr = _LOCAL_DATA_PTR.substitute(
-        DOMAIN=domain, HOSTNAME=hostname, RDDA=addr.reverse_pointer
+        DOMAIN=domain, HOSTNAME=hostname, RDDA=addr.reverse_pointer, TTL=ttl
     )
     na = (
-        _LOCAL_DATA_A.substitute(DOMAIN=domain, HOSTNAME=hostname, ADDR=addr)
+        _LOCAL_DATA_A.substitute(DOMAIN=domain, HOSTNAME=hostname, ADDR=addr, TTL=ttl)
         if isinstance(addr, IPv4Address)
-        else _LOCAL_DATA_AAAA.substitute(DOMAIN=domain, HOSTNAME=hostname, ADDR=addr)
+        else _LOCAL_DATA_AAAA.substitute(
+            DOMAIN=domain, HOSTNAME=hostname, ADDR=addr, TTL=ttl
+        )
     )
     return zone, ptr, na
 
 
-def _ctl(op: str, *args: str) -> None:
-    stdin = (linesep.join(args) + linesep).encode()
-    run((UNBOUND_CTL, op), check=True, input=stdin, timeout=SHORT_DURATION)
+def _add(records: Iterable[_Lease]) -> None:
+    networks = load_networks()
+    zones: MutableSequence[str] = []
+    datas: MutableSequence[str] = []
+    for hostname, addr in records:
+        if parsed := _parse(networks, hostname=hostname, addr=addr):
+            zone, ptr, na = parsed
+            zones.append(f"{zone} {_ZONE_TYPE}")
+            datas.extend((ptr, na))
+            print("ADD", "--", hostname, addr, file=stderr)
+
+    if zones:
+        ctl("local_zones", *zones)
+        ctl("local_datas", *datas)
+
+
+def _rm(records: Iterable[_Lease]) -> None:
+    networks = load_networks()
+    zones: MutableSequence[str] = []
+    datas: MutableSequence[str] = []
+    for hostname, addr in records:
+        if parsed := _parse(networks, hostname=hostname, addr=addr):
+            zone, ptr, na = parsed
+            zones.append(zone)
+            datas.extend((ptr, na))
+            print("RM ", "--", hostname, addr, file=stderr)
+
+    if zones:
+        ctl("local_zones_remove", *zones)
+        ctl("local_datas_remove", *datas)
+
+
+def _unbound_pid() -> str:
+    try:
+        return UNBOUND_PID.read_text().strip()
+    except FileNotFoundError:
+        return ""
+
+
+class _Reconciler:
+    def __init__(self) -> None:
+        self._pid = ""
+        self._records: MutableMapping[_Lease, _Record] = {}
+        self._rejected: MutableSet[_Lease] = set()
+        self._zones: MutableSet[str] = set()
+        self._datas: MutableSet[str] = set()
+
+    def _sync(self) -> None:
+        if (pid := _unbound_pid()) != self._pid:
+            self._pid = pid
+            self._zones.clear()
+            self._datas.clear()
 
+        zones: MutableSet[str] = set()
+        datas: MutableSet[str] = set()
+        for zone, ptr, na in self._records.values():
+            zones.add(zone)
+            datas.update((ptr, na))
 
-def _add(hostname: str, addr: IPAddress) -> None:
-    zone, ptr, na = _parse(hostname, addr=addr)
-    _ctl("local_zones", f"{zone} {_ZONE_TYPE}")
-    _ctl("local_datas", ptr, na)
+        if rm_datas := self._datas - datas:
+            ctl("local_datas_remove", *rm_datas)
+            self._datas -= rm_datas
+        if rm_zones := self._zones - zones:
+            ctl("local_zones_remove", *rm_zones)
+            self._zones -= rm_zones
+        if add_zones := zones - self._zones:
+            ctl("local_zones", *(f"{zone} {_ZONE_TYPE}" for zone in add_zones))
+            self._zones |= add_zones
+        if add_datas := datas - self._datas:
+            ctl("local_datas", *add_datas)
+            self._datas |= add_datas
 
-    print("ADD", "--", hostname, addr, file=stderr)
+        for data in rm_datas:
+            print("RM ", "--", data, file=stderr)
+        for data in add_datas:
+            print("ADD", "--", data, file=stderr)
 
+    def _classify(
+        self, records: Iterable[_Lease], known: Mapping[_Lease, _Record]
+    ) -> Iterator[Tuple[_Lease, _Record]]:
+        networks: Optional[Networks] = None
+        for lease in records:
+            if record := known.get(lease):
+                yield lease, record
+            elif lease not in self._rejected:
+                networks = networks or load_networks()
+                hostname, addr = lease
+                if record := _parse(networks, hostname=hostname, addr=addr):
+                    yield lease, record
+                else:
+                    self._rejected.add(lease)
 
-def _rm(hostname: str, addr: IPAddress) -> None:
-    zone, ptr, na = _parse(hostname, addr=addr)
-    _ctl("local_zones_remove", zone)
-    _ctl("local_datas_remove", ptr, na)
+    def reload(self) -> None:
+        current = {*leases()}
+        self._rejected &= current
+        self._records = dict(self._classify(current, known=self._records))
+        self._sync()
 
-    print("RM ", "--", hostname, addr, file=stderr)
+    def add(self, records: Iterable[_Lease]) -> None:
+        self._records.update(self._classify(records, known=self._records))
+        self._sync()
 
+    def rm(self, records: Iterable[_Lease]) -> None:
+        for lease in records:
+            self._records.pop(lease, None)
+        self._sync()
 
-def _parse_args(args: Sequence[str]) -> Namespace:
+
+def _parse_args(args: Sequence[str]) -> Tuple[Namespace, Sequence[str]]:
+    parser = ArgumentParser()
+    parser.add_argument("--serve", action="store_true")
+    return parser.parse_known_args(args)
+
+
+def _parse_event(args: Sequence[str]) -> Namespace:
     parser = ArgumentParser()
     parser.add_argument("op", choices=("tftp", "old", "add", "del"))
     parser.add_argument("mac")
@@ -78,16 +194,64 @@ def _parse_args(args: Sequence[str]) -> Namespace:
     return parser.parse_args(args)
 
 
-def main(argv: Sequence[str]) -> None:
-    args = _parse_args(argv)
-    addr: IPAddress = ip_address(args.ip)
-    hostname = environ.get("DNSMASQ_SUPPLIED_HOSTNAME", args.hostname)
+def _handle(
+    op: str, ip: str, hostname: Optional[str], add: _Apply, rm: _Apply
+) -> None:
+    addr: IPAddress = ip_address(ip)
     if hostname:
-        if args.op in {"tftp"}:
+        if op in {"tftp"}:
             pass
-        elif args.op in {"old", "add"}:
-            _add(hostname, addr=addr)
-        elif args.op in {"del"}:
-            _rm(hostname, addr=addr)
+        elif op in {"old", "add"}:
+            add(((hostname, addr),))
+        elif op in {"del"}:
+            rm(((hostname, addr),))
         else:
-            assert False, argv
+            assert False, op
+
+
+class _Server(UnixStreamServer):
+    reconciler = _Reconciler()
+    _due = 0.0
+
+    def service_actions(self) -> None:
+        if (now := monotonic()) >= self._due:
+            self._due = now + _RECONCILE_INTERVAL
+            try:
+                self.reconciler.reload()
+            except Exception:
+                print_exc()
+
+
+class _Handler(StreamRequestHandler):
+    def handle(self) -> None:
+        reconciler = cast(_Server, self.server).reconciler
+        fields = self.rfile.read().decode().split("\0")
+        op, _, ip, hostname, _ = fields
+        try:
+            _handle(
+                op,
+                ip=ip,
+                hostname=hostname,
+                add=reconciler.add,
+                rm=reconciler.rm,
+            )
+        except Exception:
+            print_exc()
+            self.wfile.write(_NAK)
+        else:
+            self.wfile.write(_ACK)
+
+
+def _serve() -> None:
+    DOMAINS_SOCK.unlink(missing_ok=True)
+    with _Server(str(DOMAINS_SOCK), _Handler) as srv:
+        srv.serve_forever()
+
+
+def main(argv: Sequence[str]) -> None:
+    args, rest = _parse_args(argv)
+    if args.serve:
+        _serve()
+    else:
+        event = _parse_event(rest)
+        _handle(event.op, ip=event.ip, hostname=event.hostname, add=_add, rm=_rm)
@@ -1,6 +1,10 @@
 from dataclasses import dataclass
+from functools import lru_cache
+from hashlib import sha256
 from ipaddress import IPv4Address, IPv6Address
 from itertools import chain, islice
+from json import dumps, loads
+from os import getpid
 from typing import (
     AbstractSet,
     Iterable,
@@ -13,11 +17,15 @@ from typing import (
     cast,
 )
 
-from std2.ipaddress import IPAddress
+from std2.ipaddress import IPAddress, IPNetwork
+from std2.pickle.decoder import new_decoder
+from std2.pickle.encoder import new_encoder
+from std2.pickle.types import DecodeError
 
-from .consts import SERVER_NAME
-from .leases import leases
-from .options.parser import settings
+from .alloc import Allocator, allocator
+from .consts import FORWARDS_JSON, server_name
+from .leases import lease_db, leases
+from .options.parser import settings, settings_manifest
 from .options.types import Accessible, PortForward, Protocol
 from .types import DualStack, Networks
 
@@ -55,7 +63,38 @@ class Split(_Dest):
     DOMAIN: str
 
 
-def _leased(networks: Networks) -> MutableMapping[str, MutableSet[IPAddress]]:
+_Specs = Tuple[AbstractSet[_Forwarded], AbstractSet[_Available], AbstractSet[Split]]
+
+
+@dataclass(frozen=True)
+class _Stored:
+    fingerprint: str
+    specs: _Specs
+
+
+class _Leased:
+    def __init__(self, leased: Mapping[str, AbstractSet[IPAddress]]) -> None:
+        self._leased = {name: {*addrs} for name, addrs in leased.items()}
+        self._pools: MutableMapping[IPNetwork, Allocator] = {}
+
+    def pool(self, network: IPNetwork) -> Allocator:
+        if (pool := self._pools.get(network)) is None:
+            pool = self._pools[network] = allocator(network)
+            for addrs in self._leased.values():
+                for addr in addrs:
+                    pool.reserve(addr)
+        return pool
+
+    def addrs(self, hostname: str) -> AbstractSet[IPAddress]:
+        return self._leased.setdefault(hostname, set())
+
+    def add(self, hostname: str, addr: IPAddress) -> None:
+        self._leased.setdefault(hostname, set()).add(addr)
+        for pool in self._pools.values():
+            pool.reserve(addr)
+
+
+def _leased(networks: Networks) -> _Leased:
     trusted_ifs = len(settings().interfaces.trusted)
     guest_ifs = len(settings().interfaces.guest)
 
@@ -64,7 +103,7 @@ def _leased(networks: Networks) -> MutableMapping[str, MutableSet[IPAddress]]:
         addrs = leased.setdefault(name, set())
         addrs.add(addr)
 
-    addrs = leased.setdefault(SERVER_NAME, set())
+    addrs = leased.setdefault(server_name(), set())
     for addr in cast(
         Iterator[IPAddress],
         chain(
@@ -75,36 +114,29 @@ def _leased(networks: Networks) -> MutableMapping[str, MutableSet[IPAddress]]:
         ),
     ):
         addrs.add(addr)
-    return leased
+    return _Leased(leased)
 
 
 def _pick(
-    leased: MutableMapping[str, MutableSet[IPAddress]], stack: DualStack, hostname: str
+    leased: _Leased, stack: DualStack, hostname: str
 ) -> Tuple[IPv4Address, IPv6Address]:
-    lease_addrs = leased.setdefault(hostname, set())
-    others = {addr for hn, addrs in leased.items() if hn != hostname for addr in addrs}
+    lease_addrs = leased.addrs(hostname)
 
     v4 = next(
-        chain(
-            (addr for addr in lease_addrs if isinstance(addr, IPv4Address)),
-            (addr for addr in stack.v4.hosts() if addr not in others),
-        )
-    )
+        (addr for addr in lease_addrs if isinstance(addr, IPv4Address)),
+        None,
+    ) or cast(IPv4Address, leased.pool(stack.v4).first())
     v6 = next(
-        chain(
-            (addr for addr in lease_addrs if isinstance(addr, IPv6Address)),
-            (addr for addr in stack.v6.hosts() if addr not in others),
-        )
-    )
+        (addr for addr in lease_addrs if isinstance(addr, IPv6Address)),
+        None,
+    ) or cast(IPv6Address, leased.pool(stack.v6).first())
 
-    lease_addrs.add(v4)
-    lease_addrs.add(v6)
+    leased.add(hostname, addr=v4)
+    leased.add(hostname, addr=v6)
     return v4, v6
 
 
-def forwarded_ports(
-    networks: Networks,
-) -> Tuple[AbstractSet[_Forwarded], AbstractSet[_Available], AbstractSet[Split]]:
+def _calculate(networks: Networks) -> _Specs:
     leased = _leased(networks)
 
     def c1(
@@ -166,6 +198,48 @@ def forwarded_ports(
     return fwd, available, split
 
 
+@lru_cache(maxsize=1)
+def _encoded(networks: Networks) -> bytes:
+    nets = new_encoder[Networks](Networks)(networks)
+    return dumps(nets, check_circular=False, sort_keys=True).encode()
+
+
+def _fingerprint(networks: Networks) -> str:
+    hashed = sha256(server_name().encode())
+    hashed.update(repr(settings_manifest()).encode())
+    hashed.update(_encoded(networks))
+    hashed.update(lease_db().fingerprint().encode())
+    return hashed.hexdigest()
+
+
+@lru_cache(maxsize=1)
+def _specs(fingerprint: str, networks: Networks) -> _Specs:
+    try:
+        json = loads(FORWARDS_JSON.read_text())
+        stored = new_decoder[_Stored](_Stored)(json)
+    except (OSError, ValueError, DecodeError):
+        pass
+    else:
+        if stored.fingerprint == fingerprint:
+            return stored.specs
+
+    specs = _calculate(networks)
+    stored = _Stored(fingerprint=fingerprint, specs=specs)
+    data = new_encoder[_Stored](_Stored)(stored)
+    tmp = FORWARDS_JSON.with_name(f".{FORWARDS_JSON.name}.{getpid()}")
+    try:
+        FORWARDS_JSON.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(dumps(data, check_circular=False, ensure_ascii=False))
+        tmp.replace(FORWARDS_JSON)
+    except OSError:
+        pass
+    return specs
+
+
+def forwarded_ports(networks: Networks) -> _Specs:
+    return _specs(_fingerprint(networks), networks=networks)
+
+
 def dhcp_fixed(fwds: Iterable[_Dest]) -> Iterator[_Dest]:
     seen: MutableSet[str] = set()
     for fwd in fwds:
@@ -0,0 +1,92 @@
+from ctypes import CDLL, get_errno
+from dataclasses import dataclass
+from enum import IntFlag
+from os import O_CLOEXEC, O_NONBLOCK, close, fsencode, read, strerror
+from pathlib import PurePath
+from select import select
+from struct import Struct
+from types import TracebackType
+from typing import Iterator, MutableMapping, Optional, Sequence, Type
+
+_EVENT = Struct("iIII")
+
+
+class Mask(IntFlag):
+    MODIFY = 0x00000002
+    ATTRIB = 0x00000004
+    CLOSE_WRITE = 0x00000008
+    MOVED_FROM = 0x00000040
+    MOVED_TO = 0x00000080
+    CREATE = 0x00000100
+    DELETE = 0x00000200
+    DELETE_SELF = 0x00000400
+    MOVE_SELF = 0x00000800
+    Q_OVERFLOW = 0x00004000
+    IGNORED = 0x00008000
+    ISDIR = 0x40000000
+
+
+@dataclass(frozen=True)
+class Event:
+    path: PurePath
+    mask: Mask
+
+
+class Inotify:
+    def __init__(self) -> None:
+        self._libc = CDLL(None, use_errno=True)
+        self._wds: MutableMapping[int, PurePath] = {}
+        self._fd = self._libc.inotify_init1(O_NONBLOCK | O_CLOEXEC)
+        if self._fd < 0:
+            errno = get_errno()
+            raise OSError(errno, strerror(errno))
+
+    def __enter__(self) -> "Inotify":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc: Optional[BaseException],
+        tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        close(self._fd)
+
+    def fileno(self) -> int:
+        return self._fd
+
+    def watch(self, path: PurePath, mask: Mask) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, fsencode(path), int(mask))
+        if wd < 0:
+            errno = get_errno()
+            raise OSError(errno, strerror(errno), str(path))
+        else:
+            self._wds[wd] = path
+
+    def _parse(self, buf: bytes) -> Iterator[Event]:
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _, length = _EVENT.unpack_from(buf, offset)
+            offset += _EVENT.size
+            name = buf[offset : offset + length].rstrip(b"\0").decode()
+            offset += length
+
+            if root := self._wds.get(wd):
+                yield Event(path=root / name if name else root, mask=Mask(mask))
+            if mask & Mask.IGNORED:
+                self._wds.pop(wd, None)
+
+    def read(self, timeout: Optional[float]) -> Sequence[Event]:
+        ready, _, _ = select((self._fd,), (), (), timeout)
+        if not ready:
+            return ()
+        else:
+            try:
+                buf = read(self._fd, 2**16)
+            except BlockingIOError:
+                return ()
+            else:
+                return tuple(self._parse(buf))
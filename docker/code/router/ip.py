@@ -1,16 +1,55 @@
 from dataclasses import dataclass
 from functools import lru_cache
-from ipaddress import IPv6Address
+from ipaddress import IPv6Address, ip_address
 from json import dumps, loads
-from subprocess import check_output
-from typing import AbstractSet, Optional, Sequence
+from socket import AF_UNSPEC, NETLINK_ROUTE, socket
+from struct import Struct
+from typing import (
+    AbstractSet,
+    Iterator,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from std2.ipaddress import IPAddress
-from std2.pickle.decoder import new_decoder
 
 from .consts import IPV6_JSON
+from .netlink import U32, attrs, cstr, open_netlink, request
 from .options.parser import settings
 
+_IFINFOMSG = Struct("=BxHiII")
+_IFADDRMSG = Struct("=BBBBI")
+
+_RTM_NEWLINK = 16
+_RTM_GETLINK = 18
+_RTM_NEWADDR = 20
+_RTM_GETADDR = 22
+
+_IFLA_ADDRESS = 1
+_IFLA_IFNAME = 3
+_IFLA_MTU = 4
+_IFLA_OPERSTATE = 16
+_IFLA_LINKINFO = 18
+_IFLA_INFO_KIND = 1
+
+_IFA_ADDRESS = 1
+_IFA_LOCAL = 2
+_IFA_FLAGS = 8
+_IFA_F_TENTATIVE = 0x40
+
+_OPERSTATES = (
+    "UNKNOWN",
+    "NOTPRESENT",
+    "DOWN",
+    "LOWERLAYERDOWN",
+    "TESTING",
+    "DORMANT",
+    "UP",
+)
+
 
 @dataclass(frozen=True)
 class _AddrInfo:
@@ -29,23 +68,97 @@ class Addr:
 Addrs = Sequence[Addr]
 
 
-def addr_show() -> Addrs:
-    raw = check_output(("ip", "--json", "address", "show"), text=True)
-    json = loads(raw)
-    addrs = new_decoder[Addrs](Addrs, strict=False)(json)
-    return addrs
+@dataclass(frozen=True)
+class Link:
+    index: int
+    ifname: str
+    kind: Optional[str]
+    address: Optional[str]
+    mtu: int
+    operstate: str
 
 
-def link_show(type: str) -> AbstractSet[str]:
-    raw = check_output(("ip", "--json", "link", "show", "type", type))
-    json = loads(raw)
-    ifaces: AbstractSet[str] = {iface for link in json if (iface := link.get("ifname"))}
-    return ifaces
+@dataclass(frozen=True)
+class Snapshot:
+    links: Sequence[Link]
+    addrs: Addrs
+
+
+def _mac(raw: bytes) -> Optional[str]:
+    return ":".join(format(byte, "02x") for byte in raw) if raw else None
+
+
+def _links(sock: socket) -> Iterator[Link]:
+    req = _IFINFOMSG.pack(AF_UNSPEC, 0, 0, 0, 0)
+    for kind, body in request(sock, _RTM_GETLINK, payload=req, dump=True):
+        if kind == _RTM_NEWLINK:
+            _, _, index, _, _ = _IFINFOMSG.unpack_from(body)
+            fields = attrs(body[_IFINFOMSG.size :])
+            info = attrs(fields.get(_IFLA_LINKINFO, b""))
+            link_kind = info.get(_IFLA_INFO_KIND)
+            (mtu,) = U32.unpack(fields.get(_IFLA_MTU, bytes(U32.size)))
+            state = fields.get(_IFLA_OPERSTATE, b"\0")[0]
+            yield Link(
+                index=index,
+                ifname=cstr(fields.get(_IFLA_IFNAME, b"")),
+                kind=cstr(link_kind) if link_kind else None,
+                address=_mac(fields.get(_IFLA_ADDRESS, b"")),
+                mtu=mtu,
+                operstate=_OPERSTATES[state]
+                if state < len(_OPERSTATES)
+                else _OPERSTATES[0],
+            )
+
+
+def _addrs(sock: socket) -> Iterator[Tuple[int, _AddrInfo]]:
+    req = _IFADDRMSG.pack(AF_UNSPEC, 0, 0, 0, 0)
+    for kind, body in request(sock, _RTM_GETADDR, payload=req, dump=True):
+        if kind == _RTM_NEWADDR:
+            _, prefixlen, flags, _, index = _IFADDRMSG.unpack_from(body)
+            fields = attrs(body[_IFADDRMSG.size :])
+            if ext := fields.get(_IFA_FLAGS):
+                (flags,) = U32.unpack(ext)
+            if local := fields.get(_IFA_LOCAL, fields.get(_IFA_ADDRESS)):
+                yield index, _AddrInfo(
+                    local=ip_address(local),
+                    prefixlen=prefixlen,
+                    tentative=bool(flags & _IFA_F_TENTATIVE),
+                )
+
+
+def dump() -> Snapshot:
+    with open_netlink(NETLINK_ROUTE) as sock:
+        links = tuple(_links(sock))
+        infos: MutableMapping[int, MutableSequence[_AddrInfo]] = {}
+        for index, info in _addrs(sock):
+            infos.setdefault(index, []).append(info)
+
+    addrs = tuple(
+        Addr(
+            ifname=link.ifname,
+            addr_info=tuple(infos.get(link.index, ())),
+            address=link.address,
+        )
+        for link in links
+    )
+    return Snapshot(links=links, addrs=addrs)
 
 
-@dataclass(frozen=True)
-class Link:
-    ifname: str
+@lru_cache(maxsize=None)
+def snapshot() -> Snapshot:
+    return dump()
+
+
+def invalidate() -> None:
+    snapshot.cache_clear()
+
+
+def addr_show() -> Addrs:
+    return snapshot().addrs
+
+
+def link_show(type: str) -> AbstractSet[str]:
+    return {link.ifname for link in snapshot().links if link.kind == type}
 
 
 @lru_cache(maxsize=None)
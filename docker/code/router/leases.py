@@ -1,24 +1,163 @@
+from dataclasses import dataclass
+from functools import cache
+from hashlib import sha256
 from ipaddress import ip_address
 from os import linesep
-from typing import Iterator, Tuple
+from pathlib import Path
+from threading import Lock
+from time import time
+from typing import (
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 from std2.ipaddress import IPAddress
 
 from .consts import DHCP_SERVER_LEASES
+from .inotify import Inotify, Mask
 
+_MASK = Mask.CLOSE_WRITE | Mask.MODIFY | Mask.MOVED_TO | Mask.CREATE | Mask.DELETE
+
+
+@dataclass(frozen=True)
+class Lease:
+    expiry: int
+    mac: str
+    addr: IPAddress
+    name: Optional[str]
+    client_id: str
 
-def leases() -> Iterator[Tuple[str, IPAddress]]:
-    DHCP_SERVER_LEASES.parent.mkdir(parents=True, exist_ok=True)
-    DHCP_SERVER_LEASES.touch()
-    lines = DHCP_SERVER_LEASES.read_text().rstrip().split(linesep)
 
-    for line in reversed(lines):
+def _parse(lines: Iterable[str]) -> Iterator[Lease]:
+    for line in lines:
         if line:
             lhs, _, rest = line.partition(" ")
             if lhs == "duid":
                 pass
             else:
-                _, addr, rhs = rest.split(" ", maxsplit=2)
-                name, _, _ = rhs.rpartition(" ")
-                if name != "*":
-                    yield name, ip_address(addr)
+                mac, addr, rhs = rest.split(" ", maxsplit=2)
+                name, _, client_id = rhs.rpartition(" ")
+                yield Lease(
+                    expiry=int(lhs),
+                    mac=mac,
+                    addr=ip_address(addr),
+                    name=None if name == "*" else name,
+                    client_id=client_id,
+                )
+
+
+class LeaseDB:
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._lock = Lock()
+        self._fingerprint: Optional[Tuple[int, int, int]] = None
+        self._text = ""
+        self._digest = ""
+        self._leases: Sequence[Lease] = ()
+        self._by_mac: Mapping[str, Sequence[Lease]] = {}
+        self._by_name: Mapping[str, Sequence[Lease]] = {}
+        self._by_ip: Mapping[IPAddress, Lease] = {}
+
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._path.touch()
+        try:
+            self._inotify: Optional[Inotify] = Inotify()
+            self._inotify.watch(self._path.parent, mask=_MASK)
+        except OSError:
+            self._inotify = None
+
+    def _stat(self) -> Tuple[int, int, int]:
+        try:
+            stat = self._path.stat()
+        except FileNotFoundError:
+            return (0, 0, 0)
+        else:
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if not self._fingerprint:
+                self._fingerprint = self._stat()
+                self._load()
+            elif self._inotify:
+                if any(
+                    event.path == self._path or event.mask & Mask.Q_OVERFLOW
+                    for event in self._inotify.read(0)
+                ):
+                    self._fingerprint = self._stat()
+                    self._load()
+            elif (fingerprint := self._stat()) != self._fingerprint:
+                self._fingerprint = fingerprint
+                self._load()
+
+    def _load(self) -> None:
+        try:
+            text = self._path.read_text()
+        except FileNotFoundError:
+            text = ""
+
+        leases = tuple(_parse(text.rstrip().split(linesep)))
+        by_mac: MutableMapping[str, MutableSequence[Lease]] = {}
+        by_name: MutableMapping[str, MutableSequence[Lease]] = {}
+        by_ip: MutableMapping[IPAddress, Lease] = {}
+        for lease in leases:
+            by_mac.setdefault(lease.mac, []).append(lease)
+            if lease.name:
+                by_name.setdefault(lease.name, []).append(lease)
+            by_ip[lease.addr] = lease
+
+        self._text = text
+        self._digest = sha256(text.encode()).hexdigest()
+        self._leases = leases
+        self._by_mac, self._by_name, self._by_ip = by_mac, by_name, by_ip
+
+    def fingerprint(self) -> str:
+        self._refresh()
+        return self._digest
+
+    def text(self) -> str:
+        self._refresh()
+        return self._text
+
+    def __iter__(self) -> Iterator[Lease]:
+        self._refresh()
+        return iter(self._leases)
+
+    def __reversed__(self) -> Iterator[Lease]:
+        self._refresh()
+        return reversed(self._leases)
+
+    def active(self, now: Optional[float] = None) -> Iterator[Lease]:
+        now = time() if now is None else now
+        for lease in self:
+            if not lease.expiry or lease.expiry > now:
+                yield lease
+
+    def by_mac(self, mac: str) -> Sequence[Lease]:
+        self._refresh()
+        return self._by_mac.get(mac, ())
+
+    def by_name(self, name: str) -> Sequence[Lease]:
+        self._refresh()
+        return self._by_name.get(name, ())
+
+    def by_ip(self, addr: IPAddress) -> Optional[Lease]:
+        self._refresh()
+        return self._by_ip.get(addr)
+
+
+@cache
+def lease_db() -> LeaseDB:
+    return LeaseDB(DHCP_SERVER_LEASES)
+
+
+def leases() -> Iterator[Tuple[str, IPAddress]]:
+    for lease in reversed(lease_db()):
+        if lease.name:
+            yield lease.name, lease.addr
@@ -0,0 +1,127 @@
+from itertools import count
+from socket import AF_NETLINK, SOCK_RAW, socket
+from struct import Struct
+from typing import Iterator, Mapping, Tuple
+
+from .consts import SHORT_DURATION
+
+NETLINK_GENERIC = 16
+
+_NLMSG = Struct("=IHHII")
+_NLMSGERR = Struct("=i")
+_RTATTR = Struct("=HH")
+_GENLMSG = Struct("=BBxx")
+
+_NLM_F_REQUEST = 0x1
+_NLM_F_ACK = 0x4
+_NLM_F_DUMP = 0x300
+_NLMSG_ERROR = 0x2
+_NLMSG_DONE = 0x3
+_NLA_TYPE_MASK = 0x3FFF
+_NLA_F_NESTED = 0x8000
+
+_GENL_ID_CTRL = 0x10
+_CTRL_CMD_GETFAMILY = 3
+_CTRL_ATTR_FAMILY_ID = 1
+_CTRL_ATTR_FAMILY_NAME = 2
+
+U8 = Struct("=B")
+U16 = Struct("=H")
+U32 = Struct("=I")
+U64 = Struct("=Q")
+
+_SEQ = count(1)
+
+
+def _align(length: int) -> int:
+    return (length + 3) & ~3
+
+
+def open_netlink(protocol: int) -> socket:
+    sock = socket(AF_NETLINK, SOCK_RAW, protocol)
+    sock.settimeout(SHORT_DURATION)
+    sock.bind((0, 0))
+    return sock
+
+
+def attr_list(buf: bytes) -> Iterator[Tuple[int, bytes]]:
+    offset = 0
+    while offset + _RTATTR.size <= len(buf):
+        length, kind = _RTATTR.unpack_from(buf, offset)
+        if length < _RTATTR.size:
+            break
+        yield kind & _NLA_TYPE_MASK, buf[offset + _RTATTR.size : offset + length]
+        offset += _align(length)
+
+
+def attrs(buf: bytes) -> Mapping[int, bytes]:
+    return dict(attr_list(buf))
+
+
+def attr(kind: int, data: bytes) -> bytes:
+    length = _RTATTR.size + len(data)
+    padding = bytes(_align(length) - length)
+    return _RTATTR.pack(length, kind) + data + padding
+
+
+def nested(kind: int, data: bytes) -> bytes:
+    return attr(kind | _NLA_F_NESTED, data)
+
+
+def cstr(raw: bytes) -> str:
+    return raw.split(b"\0", 1)[0].decode()
+
+
+def request(
+    sock: socket, msg_type: int, payload: bytes, dump: bool
+) -> Iterator[Tuple[int, bytes]]:
+    seq = next(_SEQ)
+    flags = _NLM_F_REQUEST | (_NLM_F_DUMP if dump else _NLM_F_ACK)
+    header = _NLMSG.pack(_NLMSG.size + len(payload), msg_type, flags, seq, 0)
+    sock.sendall(header + payload)
+
+    while True:
+        buf = sock.recv(2**17)
+        offset = 0
+        while offset + _NLMSG.size <= len(buf):
+            length, kind, _, msg_seq, _ = _NLMSG.unpack_from(buf, offset)
+            body = buf[offset + _NLMSG.size : offset + length]
+            offset += _align(length)
+
+            if msg_seq != seq:
+                continue
+            elif kind == _NLMSG_DONE:
+                return
+            elif kind == _NLMSG_ERROR:
+                (errno,) = _NLMSGERR.unpack_from(body)
+                if errno:
+                    raise OSError(-errno, f"netlink request failed -- {msg_type}")
+                else:
+                    return
+            else:
+                yield kind, body
+
+
+def genl_request(
+    sock: socket, family: int, cmd: int, version: int, payload: bytes, dump: bool
+) -> Iterator[bytes]:
+    msg = _GENLMSG.pack(cmd, version) + payload
+    for _, body in request(sock, msg_type=family, payload=msg, dump=dump):
+        yield body[_GENLMSG.size :]
+
+
+def genl_family(sock: socket, name: str) -> int:
+    payload = attr(_CTRL_ATTR_FAMILY_NAME, name.encode() + b"\0")
+    for body in genl_request(
+        sock,
+        family=_GENL_ID_CTRL,
+        cmd=_CTRL_CMD_GETFAMILY,
+        version=1,
+        payload=payload,
+        dump=False,
+    ):
+        if family_id := attrs(body).get(_CTRL_ATTR_FAMILY_ID):
+            (family,) = U16.unpack_from(family_id)
+            return family
+    else:
+        raise OSError(f"genetlink family not found -- {name}")
@@ -1,13 +1,19 @@
 from dataclasses import asdict
 from functools import cache
-from typing import Any, Iterator
+from json import dumps, loads
+from os import getpid
+from pathlib import Path
+from typing import Any, Iterator, Optional, Sequence, Tuple
 
 from std2.graphlib import merge
 from std2.locale import pathsort_key
 from std2.pickle.decoder import new_decoder
+from std2.pickle.encoder import new_encoder
+from std2.pickle.types import DecodeError
 from yaml import safe_load
 
-from ..consts import CONFIG, DEFAULT_CONFIG, NTP_SOURCES, PTP_DEVICES
+from ..consts import CONFIG, DEFAULT_CONFIG, NTP_SOURCES, SETTINGS_CACHE, ptp_devices
+from . import types
 from .types import (
     DHCP,
     DNS,
@@ -23,15 +29,20 @@ from .types import (
     _IPAddresses,
 )
 
+_Manifest = Sequence[Tuple[str, int, int]]
+
+
+def config_files() -> Sequence[Path]:
+    return (DEFAULT_CONFIG, *sorted(CONFIG.rglob("*.yml"), key=pathsort_key))
+
 
 def _raw() -> Settings:
     def cont() -> Iterator[Any]:
-        for path in sorted(CONFIG.rglob("*.yml"), key=pathsort_key):
+        for path in config_files():
             yml = safe_load(path.read_text())
             yield yml
 
-    yml = safe_load(DEFAULT_CONFIG.read_text())
-    conf = merge(yml, *cont())
+    conf = merge(*cont())
     decoder = new_decoder[Settings](Settings)
     settings = decoder(conf)
     return settings
@@ -58,13 +69,14 @@ def _validate_bindings(bindings: PortBindings) -> None:
     assert len(ports) == len({*ports})
 
 
-@cache
-def settings() -> Settings:
+def _build() -> Settings:
     raw = _raw()
     _validate_bindings(raw.port_bindings)
 
     assert 16 <= raw.ip_addresses.ipv4.managed_prefix_len <= 24
     assert 16 <= raw.ip_addresses.ipv4.tor_prefix_len <= 24
+    assert raw.stats.concurrency >= (2 if raw.stats.sample else 1)
+    assert raw.stats.history >= 1
 
     settings = Settings(
         interfaces=raw.interfaces,
@@ -122,9 +134,67 @@ def settings() -> Settings:
         ),
         ntp=Ntp(
             enabled=raw.ntp.enabled
-            and (any(NTP_SOURCES.glob("*.sources")) or bool(PTP_DEVICES)),
+            and (any(NTP_SOURCES.glob("*.sources")) or bool(ptp_devices())),
             local_options=raw.ntp.local_options,
             refclock_options=raw.ntp.refclock_options,
         ),
+        stats=raw.stats,
     )
     return settings
+
+
+def _manifest() -> _Manifest:
+    paths = (
+        Path(__file__),
+        Path(types.__file__),
+        *config_files(),
+        *sorted(NTP_SOURCES.glob("*.sources")),
+        *ptp_devices(),
+    )
+
+    def cont() -> Iterator[Tuple[str, int, int]]:
+        for path in paths:
+            stat = path.stat()
+            yield str(path), stat.st_mtime_ns, stat.st_size
+
+    return tuple(cont())
+
+
+def _cached(manifest: Any) -> Optional[Settings]:
+    try:
+        json = loads(SETTINGS_CACHE.read_text())
+        if json["manifest"] != manifest:
+            return None
+        else:
+            return new_decoder[Settings](Settings)(json["settings"])
+    except (OSError, ValueError, TypeError, KeyError, DecodeError):
+        return None
+
+
+@cache
+def _loaded() -> Tuple[_Manifest, Settings]:
+    manifest = _manifest()
+    encoded = loads(dumps(new_encoder[_Manifest](_Manifest)(manifest)))
+    if cached := _cached(encoded):
+        return manifest, cached
+
+    settings = _build()
+    data = {"manifest": encoded, "settings": new_encoder[Settings](Settings)(settings)}
+    tmp = SETTINGS_CACHE.with_name(f".{SETTINGS_CACHE.name}.{getpid()}")
+    try:
+        SETTINGS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(dumps(data, check_circular=False, ensure_ascii=False))
+        tmp.replace(SETTINGS_CACHE)
+    except OSError:
+        pass
+    return manifest, settings
+
+
+def settings() -> Settings:
+    _, settings = _loaded()
+    return settings
+
+
+def settings_manifest() -> _Manifest:
+    manifest, _ = _loaded()
+    return manifest
@@ -124,6 +124,15 @@ class Ntp:
     refclock_options: str
 
 
+@dataclass(frozen=True)
+class Stats:
+    concurrency: int
+    timeout: float
+    ttl: Mapping[str, float]
+    history: int
+    sample: Mapping[str, float]
+
+
 @dataclass(frozen=True)
 class Settings:
     interfaces: Interfaces
@@ -141,3 +150,5 @@ class Settings:
     guest_accessible: GuestAccessible
 
     ntp: Ntp
+
+    stats: Stats
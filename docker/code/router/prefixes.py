@@ -0,0 +1,117 @@
+from dataclasses import dataclass
+from enum import Enum, auto
+from functools import lru_cache
+from ipaddress import IPv4Network
+from typing import (
+    Generic,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from std2.ipaddress import (
+    LINK_LOCAL_V4,
+    LINK_LOCAL_V6,
+    LOOPBACK_V4,
+    LOOPBACK_V6,
+    PRIVATE_V4,
+    PRIVATE_V6,
+    IPAddress,
+    IPNetwork,
+)
+
+from .options.parser import settings
+from .types import Networks
+
+_V = TypeVar("_V")
+
+
+class Role(Enum):
+    trusted = auto()
+    guest = auto()
+    wireguard = auto()
+    tor = auto()
+    nat64 = auto()
+    loopback = auto()
+    link_local = auto()
+    private = auto()
+
+
+@dataclass(frozen=True)
+class Label:
+    role: Role
+    domain: Optional[str]
+
+
+class _Trie(Generic[_V]):
+    def __init__(self, max_prefixlen: int) -> None:
+        self._max = max_prefixlen
+        self._lens: Tuple[int, ...] = ()
+        self._tables: MutableMapping[int, MutableMapping[int, _V]] = {}
+
+    def insert(self, network: IPNetwork, val: _V) -> None:
+        key = int(network.network_address) >> (self._max - network.prefixlen)
+        table = self._tables.setdefault(network.prefixlen, {})
+        table.setdefault(key, val)
+        self._lens = tuple(sorted(self._tables, reverse=True))
+
+    def lookup(self, addr: IPAddress) -> Optional[_V]:
+        integer = int(addr)
+        for prefixlen in self._lens:
+            key = integer >> (self._max - prefixlen)
+            if (val := self._tables[prefixlen].get(key)) is not None:
+                return val
+        else:
+            return None
+
+
+class PrefixIndex(Generic[_V]):
+    def __init__(self, entries: Iterable[Tuple[IPNetwork, _V]]) -> None:
+        self._v4 = _Trie[_V](32)
+        self._v6 = _Trie[_V](128)
+        for network, val in entries:
+            trie = self._v4 if isinstance(network, IPv4Network) else self._v6
+            trie.insert(network, val=val)
+
+    def lookup(self, addr: IPAddress) -> Optional[_V]:
+        trie = self._v4 if addr.version == 4 else self._v6
+        return trie.lookup(addr)
+
+
+def _entries(networks: Networks) -> Iterator[Tuple[IPNetwork, Label]]:
+    domains = settings().dns.local_domains
+    managed: Mapping[Role, Tuple[IPNetwork, ...]] = {
+        Role.trusted: (networks.trusted.v4, networks.trusted.v6),
+        Role.guest: (networks.guest.v4, networks.guest.v6),
+        Role.wireguard: (networks.wireguard.v4, networks.wireguard.v6),
+        Role.tor: (networks.tor.v4, networks.tor.v6),
+        Role.nat64: (networks.nat64.v4, networks.nat64.v6),
+    }
+    named: Mapping[Role, str] = {
+        Role.trusted: domains.trusted,
+        Role.guest: domains.guest,
+        Role.wireguard: domains.wireguard,
+    }
+    reserved: Mapping[Role, Tuple[IPNetwork, ...]] = {
+        Role.loopback: (LOOPBACK_V4, LOOPBACK_V6),
+        Role.link_local: (LINK_LOCAL_V4, LINK_LOCAL_V6),
+        Role.private: (*PRIVATE_V4, PRIVATE_V6),
+    }
+
+    for role, nets in (*managed.items(), *reserved.items()):
+        label = Label(role=role, domain=named.get(role))
+        for network in nets:
+            yield network, label
+
+
+@lru_cache(maxsize=None)
+def _index(networks: Networks) -> PrefixIndex[Label]:
+    return PrefixIndex(_entries(networks))
+
+
+def classify(networks: Networks, addr: IPAddress) -> Optional[Label]:
+    return _index(networks).lookup(addr)
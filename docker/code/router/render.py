@@ -1,10 +1,29 @@
 from os.path import normcase
 from pathlib import Path, PurePath
-from typing import Any, Mapping
+from typing import AbstractSet, Any, Dict, Iterator, Mapping, MutableSet, Tuple, cast
 
 from jinja2 import Environment, FileSystemLoader, StrictUndefined
 
 
+class _Reads(Mapping[str, Any]):
+    def __init__(self, env: Mapping[str, Any], defaults: Mapping[str, Any]) -> None:
+        self._env, self._defaults = env, defaults
+        self.read: MutableSet[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._env:
+            self.read.add(key)
+            return self._env[key]
+        else:
+            return self._defaults[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter({**self._defaults, **self._env})
+
+    def __len__(self) -> int:
+        return len({**self._defaults, **self._env})
+
+
 def j2_build(*base: Path) -> Environment:
     j2 = Environment(
         enable_async=False,
@@ -19,3 +38,16 @@ def j2_build(*base: Path) -> Environment:
 def j2_render(j2: Environment, path: PurePath, env: Mapping[str, Any]) -> str:
     text = j2.get_template(normcase(path)).render(env)
     return text
+
+
+def j2_render_tracked(
+    j2: Environment, path: PurePath, env: Mapping[str, Any]
+) -> Tuple[str, AbstractSet[str]]:
+    tpl = j2.get_template(normcase(path))
+    reads = _Reads(env, defaults=tpl.globals)
+    ctx = tpl.new_context(cast(Dict[str, Any], reads), shared=True)
+    try:
+        text = j2.concat(tpl.root_render_func(ctx))  # type: ignore
+    except Exception:
+        j2.handle_exception()
+    return text, reads.read
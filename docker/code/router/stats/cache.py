@@ -0,0 +1,91 @@
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from os import linesep
+from threading import RLock
+from time import monotonic
+from typing import Callable, Iterator, Mapping, MutableMapping, Optional
+
+Feed = Callable[[], str]
+
+_STALE_FACTOR = 10
+
+
+@dataclass
+class _Counters:
+    hits: int = 0
+    stale: int = 0
+    misses: int = 0
+    coalesced: int = 0
+
+
+@dataclass
+class _Entry:
+    at: float = 0.0
+    value: Optional[str] = None
+    inflight: Optional["Future[str]"] = None
+    counters: _Counters = field(default_factory=_Counters)
+
+
+def _done(value: str) -> "Future[str]":
+    fut: "Future[str]" = Future()
+    fut.set_result(value)
+    return fut
+
+
+class FeedCache:
+    def __init__(self, pool: Executor, ttls: Mapping[str, float]) -> None:
+        self._pool = pool
+        self._ttls = ttls
+        self._lock = RLock()
+        self._entries: MutableMapping[str, _Entry] = {}
+
+    def _refresh(self, entry: _Entry, feed: Feed) -> "Future[str]":
+        def cont(fut: "Future[str]") -> None:
+            with self._lock:
+                entry.inflight = None
+                if not fut.cancelled() and not fut.exception():
+                    entry.value, entry.at = fut.result(), monotonic()
+
+        fut = entry.inflight = self._pool.submit(feed)
+        fut.add_done_callback(cont)
+        return fut
+
+    def fetch(self, key: str, feed: Feed) -> "Future[str]":
+        ttl = self._ttls.get(key, 0)
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            counters, age = entry.counters, monotonic() - entry.at
+
+            if entry.value is not None and age < ttl:
+                counters.hits += 1
+                return _done(entry.value)
+            elif entry.value is not None and age < ttl * _STALE_FACTOR:
+                counters.stale += 1
+                if not entry.inflight:
+                    self._refresh(entry, feed=feed)
+                return _done(entry.value)
+            elif entry.inflight:
+                counters.coalesced += 1
+                return entry.inflight
+            else:
+                counters.misses += 1
+                return self._refresh(entry, feed=feed)
+
+    def report(self) -> str:
+        def cont() -> Iterator[str]:
+            cols = ("feed", "ttl", "hits", "stale", "misses", "coalesced")
+            yield "".join(col.rjust(12) for col in cols)
+            with self._lock:
+                for key, entry in sorted(self._entries.items()):
+                    counters = entry.counters
+                    row = (
+                        key,
+                        self._ttls.get(key, 0),
+                        counters.hits,
+                        counters.stale,
+                        counters.misses,
+                        counters.coalesced,
+                    )
+                    yield "".join(str(col).rjust(12) for col in row)
+
+        return linesep.join(cont())
@@ -1,8 +1,5 @@
-from ..consts import DHCP_SERVER_LEASES
+from ..leases import lease_db
 
 
 def feed() -> str:
-    DHCP_SERVER_LEASES.parent.mkdir(parents=True, exist_ok=True)
-    DHCP_SERVER_LEASES.touch()
-    leases = DHCP_SERVER_LEASES.read_text()
-    return leases.strip()
+    return lease_db().text().strip()
@@ -1,10 +1,9 @@
-from json import dumps
-from subprocess import check_output
 from typing import Any, Tuple, Union
 
 from std2.configparser import hydrate
 
-from ..consts import SHORT_DURATION, UNBOUND_CTL
+from ..unbound import ctl
+from .yml import dumps
 
 
 def _parse_stat(line: str) -> Tuple[str, Union[int, float]]:
@@ -25,10 +24,6 @@ def _parse_stats(raw: str) -> Any:
 
 
 def feed() -> str:
-    raw = check_output(
-        (UNBOUND_CTL, "stats_noreset"), text=True, timeout=SHORT_DURATION
-    )
+    raw = ctl("stats_noreset")
     data = _parse_stats(raw)
-    json = dumps(data, check_circular=False, ensure_ascii=False)
-    yaml = check_output(("sortd", "yaml"), text=True, input=json)
-    return yaml.strip()
+    return dumps(data).strip()
@@ -1,11 +1,9 @@
 from dataclasses import asdict
 from itertools import chain
-from json import dumps
-from subprocess import check_output
 
-from ..consts import SHORT_DURATION
 from ..forwards import forwarded_ports
 from .subnets import load_networks
+from .yml import dumps
 
 
 def feed() -> str:
@@ -14,6 +12,4 @@ def feed() -> str:
     data = tuple(
         {k: str(v) for k, v in asdict(dc).items()} for dc in chain.from_iterable(specs)
     )
-    json = dumps(data, check_circular=False, ensure_ascii=False, allow_nan=False)
-    raw = check_output(("sortd", "yaml"), text=True, input=json, timeout=SHORT_DURATION)
-    return raw.strip()
+    return dumps(data).strip()
@@ -1,12 +1,26 @@
 from itertools import chain
 from os import linesep
-from subprocess import check_output
+from typing import Iterator
 
+from ..ip import Snapshot, dump
 from ..options.parser import settings
 
 
-def _show(interface: str) -> str:
-    return check_output(("ip", "addr", "show", "dev", interface), text=True)
+def _show(snap: Snapshot, interface: str) -> Iterator[str]:
+    for link, addr in zip(snap.links, snap.addrs):
+        if link.ifname == interface:
+            kind = f" {link.kind}" if link.kind else ""
+            state = f"mtu {link.mtu} state {link.operstate}"
+            yield f"{link.index}: {link.ifname}:{kind} {state}"
+            if link.address:
+                yield f"    link {link.address}"
+            for info in addr.addr_info:
+                inet = "inet" if info.local.version == 4 else "inet6"
+                tentative = " tentative" if info.tentative else ""
+                yield f"    {inet} {info.local}/{info.prefixlen}{tentative}"
+            break
+    else:
+        yield f"{interface}: NOT FOUND"
 
 
 def feed() -> str:
@@ -17,4 +31,5 @@ def feed() -> str:
         interfaces.guest,
         (interfaces.wan,),
     )
-    return linesep.join(map(_show, ifs))
+    snap = dump()
+    return linesep.join(line for ifname in ifs for line in _show(snap, ifname))
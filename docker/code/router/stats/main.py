@@ -1,38 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutTimeoutError
 from enum import Enum
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler
 from os import sep
-from pathlib import Path, PurePath
-from typing import AbstractSet, Any, Callable, Mapping
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from sys import stderr
+from typing import AbstractSet, Any, Callable, Mapping, Sequence, Tuple
 from urllib.parse import unquote, urlsplit
 
 from py_dev.srv.static import build_j2, get
-from std2.http.server import create_server
 from std2.pathlib import POSIX_ROOT, is_relative_to
-from std2.types import never
 
 from ..consts import J2, QR_DIR
+from ..options.parser import settings
 from ..render import j2_build, j2_render
+from .cache import Feed, FeedCache
 from .chrony import feed as ch_feed
 from .dhcp import feed as dhcp_feed
 from .dns import feed as dns_feed
 from .fwds import feed as fwd_feed
 from .ip import feed as ip_feed
 from .nft import feed as nft_feed
+from .sampler import Sampler
 from .squid import feed as squid_feed
 from .subnets import feed as subnets_feed
+from .tc import collect as tc_collect
 from .tc import feed as tc_feed
+from .tc import feed_json as tc_json_feed
+from .tc import machine as tc_machine
+from .tc import table as tc_table
+from .wg import collect as wg_collect
 from .wg import feed as wg_feed
+from .wg import table as wg_table
 
-Feed = Callable[[], str]
-
-
+_SOCK = Path(sep) / "tmp" / "stats.sock"
 _INDEX_TPL = Path("show") / "index.html"
 _SHOW_TPL = Path("show") / "stats.html"
 
 
 class _Path(Enum):
     index = POSIX_ROOT
+    cache = POSIX_ROOT / "cache"
     chrony = POSIX_ROOT / "chrony"
     dhcp = POSIX_ROOT / "dhcp"
     dns = POSIX_ROOT / "dns"
@@ -42,10 +52,69 @@ class _Path(Enum):
     nft = POSIX_ROOT / "nft"
     squid = POSIX_ROOT / "squid"
     tc = POSIX_ROOT / "tc"
+    tc_json = POSIX_ROOT / "tc.json"
     wg = POSIX_ROOT / "wg"
     wgc = POSIX_ROOT / "wgc"
 
 
+_FEEDS: Mapping[_Path, Feed] = {
+    _Path.chrony: ch_feed,
+    _Path.dhcp: dhcp_feed,
+    _Path.dns: dns_feed,
+    _Path.fwd: fwd_feed,
+    _Path.ip: ip_feed,
+    _Path.nets: subnets_feed,
+    _Path.nft: nft_feed,
+    _Path.squid: squid_feed,
+    _Path.tc: tc_feed,
+    _Path.tc_json: tc_json_feed,
+    _Path.wgc: wg_feed,
+}
+
+_COLLECTORS: Mapping[_Path, Callable[[], Any]] = {
+    _Path.tc: tc_collect,
+    _Path.wgc: wg_collect,
+}
+
+_VIEWS: Mapping[_Path, Tuple[_Path, Callable[[Sequence[Any]], str]]] = {
+    _Path.tc: (_Path.tc, tc_table),
+    _Path.tc_json: (_Path.tc, tc_machine),
+    _Path.wgc: (_Path.wgc, wg_table),
+}
+
+_CONTENT_TYPES: Mapping[_Path, str] = {
+    _Path.tc_json: "application/json",
+}
+
+
+def _newest(history: Sequence[str]) -> str:
+    *_, latest = history
+    return latest
+
+
+class _Server(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+
+class _Runner:
+    def __init__(
+        self, concurrency: int, timeout: float, ttls: Mapping[str, float]
+    ) -> None:
+        self.pool = ThreadPoolExecutor(max_workers=concurrency)
+        self.cache = FeedCache(self.pool, ttls=ttls)
+        self._timeout = timeout
+
+    def run(self, path: _Path, feed: Feed) -> Tuple[HTTPStatus, str]:
+        fut = self.cache.fetch(path.name, feed=feed)
+        try:
+            return HTTPStatus.OK, fut.result(timeout=self._timeout)
+        except FutTimeoutError:
+            return HTTPStatus.GATEWAY_TIMEOUT, f"TIMEOUT :: {path.name}"
+        except Exception as e:
+            print(f"{path.name} :: {e}", file=stderr)
+            return HTTPStatus.BAD_GATEWAY, f"{type(e).__name__} :: {e}"
+
+
 def _route(handler: BaseHTTPRequestHandler) -> _Path:
     path = unquote(urlsplit(handler.path).path)
     paths: AbstractSet[_Path] = {*_Path} - {_Path.index}
@@ -56,14 +125,19 @@ def _route(handler: BaseHTTPRequestHandler) -> _Path:
         return _Path.index
 
 
-def _get(handler: BaseHTTPRequestHandler, page: bytes) -> None:
+def _get(
+    handler: BaseHTTPRequestHandler,
+    page: bytes,
+    status: HTTPStatus = HTTPStatus.OK,
+    content_type: str = "text/html",
+) -> None:
     headers = {key.casefold(): val for key, val in handler.headers.items()}
     content_len = int(headers.get("content-length", 0))
     _ = handler.rfile.read(content_len)
 
-    handler.send_response_only(HTTPStatus.OK)
+    handler.send_response_only(status)
     handler.send_header("Content-Length", value=str(len(page)))
-    handler.send_header("Content-Type", value="text/html")
+    handler.send_header("Content-Type", value=content_type)
     handler.send_header("Cache-Control", value="no-store, must-revalidate")
     handler.send_header("Expires", value="0")
     handler.end_headers()
@@ -73,6 +147,20 @@ def _get(handler: BaseHTTPRequestHandler, page: bytes) -> None:
 def main() -> None:
     static_j2 = build_j2()
     j2 = j2_build(J2)
+    concurrency = settings().stats.concurrency
+    sampling = concurrency // 2 if settings().stats.sample else 0
+    runner = _Runner(
+        concurrency=concurrency - sampling,
+        timeout=settings().stats.timeout,
+        ttls=settings().stats.ttl,
+    )
+    sampler_pool = ThreadPoolExecutor(max_workers=max(sampling, 1))
+    sampler = Sampler(sampler_pool, depth=settings().stats.history)
+    for path, feed in _FEEDS.items():
+        if interval := settings().stats.sample.get(path.name):
+            collect = _COLLECTORS.get(path, feed)
+            sampler.register(path.name, collect=collect, interval=interval)
+    sampler.start()
 
     def http_get(handler: BaseHTTPRequestHandler) -> None:
         path = _route(handler)
@@ -85,68 +173,41 @@ def main() -> None:
             page = j2_render(j2, path=_INDEX_TPL, env=env).encode()
             _get(handler, page=page)
 
-        elif path is _Path.chrony:
-            env = {"TITLE": path.name, "BODY": ch_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.dhcp:
-            env = {"TITLE": path.name, "BODY": dhcp_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.dns:
-            env = {"TITLE": path.name, "BODY": dns_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.fwd:
-            env = {"TITLE": path.name, "BODY": fwd_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.ip:
-            env = {"TITLE": path.name, "BODY": ip_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.nets:
-            env = {"TITLE": path.name, "BODY": subnets_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.squid:
-            env = {"TITLE": path.name, "BODY": squid_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.nft:
-            env = {"TITLE": path.name, "BODY": nft_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
-        elif path is _Path.tc:
-            env = {"TITLE": path.name, "BODY": tc_feed()}
+        elif path is _Path.cache:
+            env = {"TITLE": path.name, "BODY": runner.cache.report()}
             page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
             _get(handler, page=page)
 
         elif path is _Path.wg:
             get(static_j2, handler=handler, prefix=_Path.wg.value, root=QR_DIR)
 
-        elif path is _Path.wgc:
-            env = {"TITLE": path.name, "BODY": wg_feed()}
-            page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
-            _get(handler, page=page)
-
         else:
-            never(path)
+            source, view = _VIEWS.get(path, (path, _newest))
+            if sampler.latest(source.name):
+                samples = sampler.history(source.name)
+                history = tuple(sample.value for sample in samples)
+                status, body = HTTPStatus.OK, view(history)
+            else:
+                status, body = runner.run(path, feed=_FEEDS[path])
+
+            if content_type := _CONTENT_TYPES.get(path):
+                page = body.encode()
+                _get(handler, page=page, status=status, content_type=content_type)
+            else:
+                env = {"TITLE": path.name, "BODY": body}
+                page = j2_render(j2, path=_SHOW_TPL, env=env).encode()
+                _get(handler, page=page, status=status)
 
     class Handler(BaseHTTPRequestHandler):
+        def address_string(self) -> str:
+            return str(_SOCK)
+
         def do_GET(self) -> None:
             try:
                 http_get(self)
             except BrokenPipeError:
                 pass
 
-    with create_server(PurePath(sep) / "tmp" / "stats.sock", Handler) as srv:
+    _SOCK.unlink(missing_ok=True)
+    with _Server(str(_SOCK), Handler) as srv:
         srv.serve_forever()
@@ -0,0 +1,93 @@
+from collections import deque
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass, field
+from sys import stderr
+from threading import Event, RLock, Thread
+from time import monotonic, time
+from typing import (
+    Callable,
+    Deque,
+    Generic,
+    MutableMapping,
+    Optional,
+    Sequence,
+    TypeVar,
+)
+
+_T = TypeVar("_T")
+
+_STALE_FACTOR = 10
+
+
+@dataclass(frozen=True)
+class Sample(Generic[_T]):
+    at: float
+    mono: float
+    value: _T
+
+
+@dataclass
+class _Job(Generic[_T]):
+    collect: Callable[[], _T]
+    interval: float
+    ring: Deque[Sample[_T]]
+    due: float = 0.0
+    inflight: bool = False
+    lock: RLock = field(default_factory=RLock)
+
+
+class Sampler:
+    def __init__(self, pool: Executor, depth: int) -> None:
+        self._pool = pool
+        self._depth = depth
+        self._jobs: MutableMapping[str, _Job] = {}
+        self._wake = Event()
+
+    def register(self, name: str, collect: Callable[[], _T], interval: float) -> None:
+        ring: Deque[Sample[_T]] = deque(maxlen=self._depth)
+        self._jobs[name] = _Job(collect=collect, interval=interval, ring=ring)
+
+    def _submit(self, name: str, job: _Job) -> None:
+        def cont(fut: Future) -> None:
+            with job.lock:
+                job.inflight = False
+                if exc := fut.exception():
+                    print(f"{name} :: {exc}", file=stderr)
+                else:
+                    sample = Sample(at=time(), mono=monotonic(), value=fut.result())
+                    job.ring.append(sample)
+            self._wake.set()
+
+        job.inflight = True
+        self._pool.submit(job.collect).add_done_callback(cont)
+
+    def _loop(self) -> None:
+        while True:
+            now = monotonic()
+            for name, job in self._jobs.items():
+                with job.lock:
+                    if now >= job.due and not job.inflight:
+                        job.due = now + job.interval
+                        self._submit(name, job=job)
+
+            pending = (job.due for job in self._jobs.values() if job.due > now)
+            self._wake.wait(min(pending, default=now + 1) - now)
+            self._wake.clear()
+
+    def start(self) -> None:
+        Thread(target=self._loop, daemon=True).start()
+
+    def history(self, name: str) -> Sequence[Sample]:
+        if job := self._jobs.get(name):
+            with job.lock:
+                return tuple(job.ring)
+        else:
+            return ()
+
+    def latest(self, name: str) -> Optional[Sample]:
+        if job := self._jobs.get(name):
+            with job.lock:
+                sample = job.ring[-1] if job.ring else None
+            if sample and monotonic() - sample.mono < job.interval * _STALE_FACTOR:
+                return sample
+        return None
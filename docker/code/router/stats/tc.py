@@ -1,42 +1,187 @@
+from dataclasses import asdict, dataclass
+from json import dumps, loads
 from os import linesep
-from re import compile
 from subprocess import check_output
-from typing import Iterator
+from time import monotonic
+from typing import Iterator, Mapping, MutableMapping, Sequence, Tuple
 
 from std2.locale import si_prefixed
+from std2.pickle.decoder import new_decoder
 
-from ..cake.main import TC_IFB
+from ..cake.main import tc_ifb
 from ..consts import SHORT_DURATION
 from ..options.parser import settings
 
-_RE_ROW = compile(r"^(?P<header>\s+\w+)(?P<cols>(?:\s+\d+)+)$")
-_RE_COLS = compile(r"\s+(?P<quantity>\d+)")
 
+@dataclass(frozen=True)
+class Tin:
+    threshold_rate: int
+    sent_bytes: int
+    sent_packets: int
+    backlog_bytes: int
+    drops: int
+    ecn_mark: int
+    ack_drops: int
+    peak_delay_us: int
+    avg_delay_us: int
+    base_delay_us: int
 
-def _parse(raw: str) -> Iterator[str]:
-    for line in raw.splitlines():
-        if m := _RE_ROW.fullmatch(line):
-            yield m.group("header")
-            for col in _RE_COLS.finditer(m.group("cols")):
-                quantity = int(col.group("quantity"))
-                parsed = si_prefixed(quantity, precision=2)
-                yield parsed.rjust(len(col.group()))
-        else:
-            yield line
 
-        yield linesep
+@dataclass(frozen=True)
+class _Qdisc:
+    kind: str
+    tins: Sequence[Tin] = ()
 
 
-def _feed(if_name: str) -> str:
+@dataclass(frozen=True)
+class Cake:
+    direction: str
+    dev: str
+    tins: Sequence[Tin]
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    at: float
+    qdiscs: Sequence[Cake]
+
+
+@dataclass(frozen=True)
+class TinRate:
+    bits: float
+    packets: float
+    drops: float
+    marks: float
+
+
+def _show(direction: str, dev: str) -> Iterator[Cake]:
     raw = check_output(
-        ("tc", "-statistics", "qdisc", "show", "dev", if_name),
+        ("tc", "-json", "-statistics", "qdisc", "show", "dev", dev),
         text=True,
         timeout=SHORT_DURATION,
     )
+    qdiscs = new_decoder[Sequence[_Qdisc]](Sequence[_Qdisc], strict=False)(loads(raw))
+    for qdisc in qdiscs:
+        if qdisc.kind == "cake":
+            yield Cake(direction=direction, dev=dev, tins=qdisc.tins)
+
+
+def collect() -> Snapshot:
+    qdiscs = (
+        *_show("TX", dev=settings().interfaces.wan),
+        *_show("RX", dev=tc_ifb()),
+    )
+    return Snapshot(at=monotonic(), qdiscs=qdiscs)
+
+
+def _rates(prev: Snapshot, curr: Snapshot) -> Mapping[Tuple[str, int], TinRate]:
+    elapsed = curr.at - prev.at
+    before = {
+        (qdisc.dev, idx): tin
+        for qdisc in prev.qdiscs
+        for idx, tin in enumerate(qdisc.tins)
+    }
+
+    def delta(lhs: int, rhs: int) -> float:
+        return max(lhs - rhs, 0) / elapsed
+
+    rates: MutableMapping[Tuple[str, int], TinRate] = {}
+    if elapsed > 0:
+        for qdisc in curr.qdiscs:
+            for idx, tin in enumerate(qdisc.tins):
+                if old := before.get((qdisc.dev, idx)):
+                    rates[(qdisc.dev, idx)] = TinRate(
+                        bits=delta(tin.sent_bytes, old.sent_bytes) * 8,
+                        packets=delta(tin.sent_packets, old.sent_packets),
+                        drops=delta(tin.drops, old.drops),
+                        marks=delta(tin.ecn_mark, old.ecn_mark),
+                    )
+    return rates
+
 
-    return "".join(_parse(raw))
+def _latest(
+    history: Sequence[Snapshot],
+) -> Tuple[Snapshot, Mapping[Tuple[str, int], TinRate]]:
+    *_, curr = history
+    rates = _rates(history[-2], curr) if len(history) > 1 else {}
+    return curr, rates
+
+
+def _si(quantity: float, unit: str) -> str:
+    return f"{si_prefixed(round(quantity), precision=2)}{unit}"
+
+
+def _ms(delay_us: int) -> str:
+    return f"{delay_us / 1000:.2f}ms"
+
+
+def table(history: Sequence[Snapshot]) -> str:
+    cols = (
+        "tin",
+        "threshold",
+        "throughput",
+        "pkts/s",
+        "drops/s",
+        "marks/s",
+        "backlog",
+        "peak",
+        "avg",
+        "base",
+        "drops",
+        "marks",
+    )
+    snapshot, rates = _latest(history)
+
+    def cont() -> Iterator[str]:
+        for qdisc in snapshot.qdiscs:
+            yield f"-- {qdisc.direction} -- {qdisc.dev}"
+            yield "".join(col.rjust(12) for col in cols)
+            for idx, tin in enumerate(qdisc.tins):
+                rate = rates.get((qdisc.dev, idx))
+                row = (
+                    str(idx),
+                    _si(tin.threshold_rate * 8, unit="bit/s"),
+                    _si(rate.bits, unit="bit/s") if rate else "-",
+                    _si(rate.packets, unit="") if rate else "-",
+                    _si(rate.drops, unit="") if rate else "-",
+                    _si(rate.marks, unit="") if rate else "-",
+                    _si(tin.backlog_bytes, unit="B"),
+                    _ms(tin.peak_delay_us),
+                    _ms(tin.avg_delay_us),
+                    _ms(tin.base_delay_us),
+                    _si(tin.drops, unit=""),
+                    _si(tin.ecn_mark, unit=""),
+                )
+                yield "".join(col.rjust(12) for col in row)
+            yield linesep
+
+    return linesep.join(cont())
+
+
+def machine(history: Sequence[Snapshot]) -> str:
+    snapshot, rates = _latest(history)
+    data = [
+        {
+            "direction": qdisc.direction,
+            "dev": qdisc.dev,
+            "tins": [
+                {
+                    **asdict(tin),
+                    "rates": asdict(rate)
+                    if (rate := rates.get((qdisc.dev, idx)))
+                    else None,
+                }
+                for idx, tin in enumerate(qdisc.tins)
+            ],
+        }
+        for qdisc in snapshot.qdiscs
+    ]
+    return dumps(data, check_circular=False, ensure_ascii=False, allow_nan=False)
 
 
 def feed() -> str:
-    raw1, raw2 = _feed(settings().interfaces.wan), _feed(TC_IFB)
-    return "-- TX --" + linesep + raw1 + linesep * 3 + "-- RX --" + linesep + raw2
+    return table((collect(),))
+
+
+def feed_json() -> str:
+    return machine((collect(),))
@@ -1,12 +1,83 @@
-from subprocess import check_output
+from dataclasses import dataclass
+from os import linesep
+from time import monotonic, time
+from typing import Iterator, Mapping, MutableMapping, Sequence
 
-from ..consts import SHORT_DURATION
+from std2.locale import si_prefixed
+
+from ..options.parser import settings
+from ..wg import peer_names
+from ..wgnl import Device, device
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    at: float
+    wall: float
+    device: Device
+
+
+@dataclass(frozen=True)
+class _Rate:
+    rx: float
+    tx: float
+
+
+def collect() -> Snapshot:
+    dev = device(settings().interfaces.wireguard)
+    return Snapshot(at=monotonic(), wall=time(), device=dev)
+
+
+def _rates(history: Sequence[Snapshot]) -> Mapping[str, _Rate]:
+    rates: MutableMapping[str, _Rate] = {}
+    if len(history) > 1:
+        prev, curr = history[-2], history[-1]
+        elapsed = curr.at - prev.at
+        before = {peer.public_key: peer for peer in prev.device.peers}
+        if elapsed > 0:
+            for peer in curr.device.peers:
+                if old := before.get(peer.public_key):
+                    rates[peer.public_key] = _Rate(
+                        rx=max(peer.rx_bytes - old.rx_bytes, 0) * 8 / elapsed,
+                        tx=max(peer.tx_bytes - old.tx_bytes, 0) * 8 / elapsed,
+                    )
+    return rates
+
+
+def _si(quantity: float, unit: str) -> str:
+    return f"{si_prefixed(round(quantity), precision=2)}{unit}"
+
+
+def _ago(now: float, then: float) -> str:
+    return f"{round(now - then)}s" if then else "never"
+
+
+def table(history: Sequence[Snapshot]) -> str:
+    cols = ("peer", "endpoint", "handshake", "rx", "tx", "rx/s", "tx/s")
+    *_, snapshot = history
+    rates = _rates(history)
+    names = peer_names()
+
+    def cont() -> Iterator[str]:
+        dev = snapshot.device
+        yield f"-- {dev.ifname} -- {dev.public_key} -- :{dev.listen_port}"
+        yield "".join(col.rjust(16) for col in cols) + "  allowed ips"
+        for peer in dev.peers:
+            rate = rates.get(peer.public_key)
+            row = (
+                names.get(peer.public_key, peer.public_key[:8]),
+                peer.endpoint or "-",
+                _ago(snapshot.wall, then=peer.last_handshake),
+                _si(peer.rx_bytes, unit="B"),
+                _si(peer.tx_bytes, unit="B"),
+                _si(rate.rx, unit="bit/s") if rate else "-",
+                _si(rate.tx, unit="bit/s") if rate else "-",
+            )
+            allowed = ", ".join(map(str, peer.allowed_ips))
+            yield "".join(col.rjust(16) for col in row) + f"  {allowed}"
+
+    return linesep.join(cont())
 
 
 def feed() -> str:
-    raw = check_output(
-        ("sudo", "--non-interactive", "--", "wg", "show"),
-        text=True,
-        timeout=SHORT_DURATION,
-    )
-    return raw.strip().expandtabs()
+    return table((collect(),))
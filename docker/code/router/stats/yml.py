@@ -0,0 +1,27 @@
+from io import StringIO
+from typing import Any, TextIO
+
+from yaml import dump as _dump
+
+try:
+    from yaml import CSafeDumper as _Dumper
+except ImportError:
+    from yaml import SafeDumper as _Dumper  # type: ignore
+
+
+def emit(data: Any, stream: TextIO) -> None:
+    _dump(
+        data,
+        stream,
+        Dumper=_Dumper,
+        sort_keys=True,
+        allow_unicode=True,
+        default_flow_style=False,
+        width=2**16,
+    )
+
+
+def dumps(data: Any) -> str:
+    io = StringIO()
+    emit(data, stream=io)
+    return io.getvalue()
@@ -1,15 +1,16 @@
 from dataclasses import dataclass
 from fnmatch import fnmatch
-from functools import reduce
+from functools import cache, reduce
 from hashlib import sha256
 from ipaddress import IPv4Address, IPv4Network, IPv6Network, ip_interface
-from itertools import chain, islice
+from itertools import chain
 from json import loads
-from typing import AbstractSet, Iterable, Iterator, Optional
+from typing import AbstractSet, Iterable, Iterator, Optional, cast
 
 from std2.ipaddress import LOOPBACK_V4, PRIVATE_V4, IPInterface
 from std2.pickle.decoder import new_decoder
 
+from .alloc import Spans
 from .consts import NETWORKS_JSON
 from .ip import addr_show
 from .options.parser import settings
@@ -34,16 +35,18 @@ class _V6Stack:
     nat64: IPv6Network
 
 
+@cache
 def load_networks() -> Networks:
     json = loads(NETWORKS_JSON.read_text())
     networks = new_decoder[Networks](Networks)(json)
     return networks
 
 
-def _private_subnets(prefix: int) -> Iterator[IPv4Network]:
-    for network in PRIVATE_V4:
-        for subnet in network.subnets(new_prefix=max(network.prefixlen, prefix)):
-            yield subnet
+def current_networks() -> Networks:
+    try:
+        return load_networks()
+    except Exception:
+        return calculate_networks()
 
 
 def _existing(patterns: AbstractSet[str]) -> Iterator[IPv4Network]:
@@ -58,16 +61,15 @@ def _existing(patterns: AbstractSet[str]) -> Iterator[IPv4Network]:
 def _pick_private(
     existing: Iterable[IPv4Network], prefixes: Iterable[int]
 ) -> Iterator[IPv4Network]:
-    seen = {*existing}
+    spans = Spans()
+    for network in existing:
+        spans.add(network)
 
     for prefix in prefixes:
-        for candidate in _private_subnets(prefix):
-            if all(
-                not candidate.overlaps(network) and not network.overlaps(candidate)
-                for network in seen
-            ):
-                seen.add(candidate)
-                yield candidate
+        for block in PRIVATE_V4:
+            if candidate := spans.first_fit(block, prefixlen=prefix):
+                spans.add(candidate)
+                yield cast(IPv4Network, candidate)
                 break
         else:
             raise RuntimeError(f"No network available -- prefix :: {prefix}")
@@ -107,8 +109,17 @@ def _gen_prefix() -> str:
 def _v6(prefix: Optional[str]) -> _V6Stack:
     org_prefix = prefix or _gen_prefix()
     org = IPv6Network(f"{org_prefix}::/48")
-    trusted, wg, tor, guest, net69 = islice(org.subnets(new_prefix=64), 5)
-    nat64 = next(net69.subnets(new_prefix=96))
+
+    def carve(spans: Spans, block: IPv6Network, prefixlen: int) -> IPv6Network:
+        if subnet := spans.first_fit(block, prefixlen=prefixlen):
+            spans.add(subnet)
+            return cast(IPv6Network, subnet)
+        else:
+            raise RuntimeError(f"No network available -- prefix :: {prefixlen}")
+
+    spans = Spans()
+    trusted, wg, tor, guest, net69 = (carve(spans, org, prefixlen=64) for _ in range(5))
+    nat64 = carve(Spans(), net69, prefixlen=96)
 
     stack = _V6Stack(trusted=trusted, wg=wg, tor=tor, guest=guest, nat64=nat64)
     return stack
@@ -133,11 +144,13 @@ def calculate_networks() -> Networks:
 
 
 def calculate_loopback() -> IPv4Address:
-    for ip in LOOPBACK_V4.hosts():
-        if all(
-            ip not in network
-            for network in settings().ip_addresses.ipv4.loopback_exclusions
-        ):
-            return ip
+    spans = Spans()
+    spans.add(IPv4Network(LOOPBACK_V4.network_address))
+    spans.add(IPv4Network(LOOPBACK_V4.broadcast_address))
+    for network in settings().ip_addresses.ipv4.loopback_exclusions:
+        spans.add(network)
+
+    if host := spans.first_fit(LOOPBACK_V4, prefixlen=LOOPBACK_V4.max_prefixlen):
+        return cast(IPv4Address, host.network_address)
     else:
         raise ValueError()
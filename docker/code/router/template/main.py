@@ -1,8 +1,12 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, fields, is_dataclass
+from hashlib import sha256
 from ipaddress import IPv4Address, ip_address
 from itertools import chain
+from json import dumps, loads
 from locale import strxfrm
 from multiprocessing import cpu_count
+from os import getpid
+from pathlib import Path
 from pprint import pformat
 from shutil import copystat, get_terminal_size
 from socket import getaddrinfo
@@ -15,7 +19,10 @@ from typing import (
     Iterable,
     Iterator,
     Mapping,
+    MutableMapping,
     MutableSet,
+    Optional,
+    Sequence,
     Tuple,
     cast,
 )
@@ -29,23 +36,27 @@ from std2.ipaddress import (
     IPNetwork,
 )
 from std2.pathlib import walk
+from std2.pickle.decoder import new_decoder
+from std2.pickle.encoder import new_encoder
+from std2.pickle.types import DecodeError
 
 from ..consts import (
     DATA,
     PRIVATE_ADDRS,
-    PTP_DEVICES,
+    RENDERED_JSON,
     RUN,
-    SERVER_NAME,
     TEMPLATES,
     TUNNABLE,
     USER,
+    ptp_devices,
+    server_name,
 )
 from ..forwards import Split, dhcp_fixed, forwarded_ports
 from ..ip import ipv6_enabled
 from ..options.parser import settings
 from ..records import wg_records
-from ..render import j2_build, j2_render
-from ..subnets import calculate_loopback, calculate_networks, load_networks
+from ..render import j2_build, j2_render_tracked
+from ..subnets import calculate_loopback, current_networks
 from ..types import Networks
 from ..wg import gen_wg, wg_env
 
@@ -61,6 +72,16 @@ class _DNS_Record:
     TYPE: str
 
 
+@dataclass(frozen=True)
+class _Rendered:
+    keys: Sequence[str]
+    digest: str
+    output: str
+
+
+_Manifest = Mapping[str, _Rendered]
+
+
 def _resolv_addrs() -> Iterator[Tuple[IPAddress, int]]:
     srvs = settings().dns.upstream_servers
     seen: MutableSet[Tuple[IPAddress, int]] = set()
@@ -127,9 +148,9 @@ def _env(networks: Networks) -> Mapping[str, Any]:
     loop_back = calculate_loopback()
     env = {
         "CPU_COUNT": cpu_count(),
-        "DHCP_FIXED": dhcp_fixed(chain(fwds, avail, splits)),
+        "DHCP_FIXED": tuple(dhcp_fixed(chain(fwds, avail, splits))),
         "DHCP_LEASE_TIME": settings().dhcp.lease_time,
-        "DNS_ADDRS": _resolv_addrs(),
+        "DNS_ADDRS": tuple(_resolv_addrs()),
         "FORWARDED_PORTS": fwds,
         "GUEST_ACCESSIBLE": avail,
         "GUEST_BRIDGE": settings().interfaces.guest_bridge,
@@ -150,13 +171,13 @@ def _env(networks: Networks) -> Mapping[str, Any]:
         "NAT64_NETWORK_V6": networks.nat64.v6,
         "NTP_ENABLED": settings().ntp.enabled,
         "NTP_LOCAL_OPTIONS": settings().ntp.local_options,
-        "NTP_PTPS": PTP_DEVICES,
+        "NTP_PTPS": ptp_devices(),
         "NTP_REFCLOCK_OPTIONS": settings().ntp.refclock_options,
         "PRIVATE_ADDRS": PRIVATE_ADDRS,
         "PRIVATE_DOMAINS": settings().dns.private_domains,
-        "SERVER_NAME": SERVER_NAME,
+        "SERVER_NAME": server_name(),
         "SQUID_PORT": settings().port_bindings.squid,
-        "STATIC_DNS_RECORDS": _static_dns_records(splits),
+        "STATIC_DNS_RECORDS": tuple(_static_dns_records(splits)),
         "STATS_PORT": settings().port_bindings.statistics,
         "TOR_NETWORK_V4": networks.tor.v4,
         "TOR_NETWORK_V6": networks.tor.v6,
@@ -179,7 +200,7 @@ def _env(networks: Networks) -> Mapping[str, Any]:
     return env
 
 
-def _gen_keys(networks: Networks) -> None:
+def gen_keys(networks: Networks) -> None:
     _UNBOUND.mkdir(parents=True, exist_ok=True)
     if not _PEM.exists() or not _KEY.exists():
         san = (
@@ -209,14 +230,14 @@ def _gen_keys(networks: Networks) -> None:
                 "-keyout",
                 _KEY,
                 "-subj",
-                f"/CN={SERVER_NAME}.{settings().dns.local_domains.trusted}",
+                f"/CN={server_name()}.{settings().dns.local_domains.trusted}",
                 "-addext",
                 f"subjectAltName={','.join(san)}",
             )
         )
 
 
-def _pprn() -> None:
+def pprn() -> None:
     cols, _ = get_terminal_size()
     print(
         pformat(
@@ -228,16 +249,68 @@ def _pprn() -> None:
     )
 
 
-def main() -> None:
-    _pprn()
+def _canon(val: Any) -> Any:
+    if is_dataclass(val) and not isinstance(val, type):
+        return (
+            type(val).__qualname__,
+            tuple((f.name, _canon(getattr(val, f.name))) for f in fields(val)),
+        )
+    elif isinstance(val, Mapping):
+        pairs = ((_canon(key), _canon(value)) for key, value in val.items())
+        return tuple(sorted(pairs, key=repr))
+    elif isinstance(val, AbstractSet):
+        return tuple(sorted(map(_canon, val), key=repr))
+    elif isinstance(val, Sequence) and not isinstance(val, (str, bytes)):
+        return tuple(map(_canon, val))
+    else:
+        return val
+
+
+def _digest(path: Path, keys: Iterable[str], env: Mapping[str, Any]) -> str:
+    hashed = sha256(path.read_bytes())
+    for key in sorted(keys):
+        hashed.update(key.encode())
+        if key in env:
+            hashed.update(repr(_canon(env[key])).encode())
+    return hashed.hexdigest()
 
+
+def _output(dest: Path) -> Optional[str]:
     try:
-        networks = load_networks()
-    except Exception:
-        networks = calculate_networks()
+        return sha256(dest.read_bytes()).hexdigest()
+    except OSError:
+        return None
+
 
+def _load_manifest() -> _Manifest:
+    try:
+        json = loads(RENDERED_JSON.read_text())
+        manifest = new_decoder[_Manifest](_Manifest, strict=False)(json)
+    except (OSError, ValueError, DecodeError):
+        return {}
+    else:
+        return manifest
+
+
+def _dump_manifest(manifest: _Manifest) -> None:
+    data = new_encoder[_Manifest](_Manifest)(manifest)
+    tmp = RENDERED_JSON.with_name(f".{RENDERED_JSON.name}.{getpid()}")
+    try:
+        RENDERED_JSON.parent.mkdir(parents=True, exist_ok=True)
+        tmp.write_text(dumps(data, check_circular=False, ensure_ascii=False))
+        tmp.replace(RENDERED_JSON)
+    except OSError:
+        pass
+
+
+def render(networks: Networks) -> AbstractSet[Path]:
     env = _env(networks)
     j2 = j2_build(TEMPLATES)
+    stored = _load_manifest()
+    manifest: MutableMapping[str, _Rendered] = {}
+    changed: MutableSet[Path] = set()
+    dirty = False
+
     for path in walk(TEMPLATES, dirs=True):
         tpl = path.relative_to(TEMPLATES)
         dest = (RUN / tpl).resolve()
@@ -250,9 +323,40 @@ def main() -> None:
         elif path.is_dir():
             dest.mkdir(exist_ok=True)
         else:
-            text = j2_render(j2, path=tpl, env=env)
-            dest.write_text(text)
-            copystat(path, dest)
+            name = str(tpl)
+            prev = stored.get(name)
+            current = _output(dest)
+            if (
+                prev
+                and current == prev.output
+                and _digest(path, keys=prev.keys, env=env) == prev.digest
+            ):
+                manifest[name] = prev
+            else:
+                text, keys = j2_render_tracked(j2, path=tpl, env=env)
+                output = sha256(text.encode()).hexdigest()
+                manifest[name] = _Rendered(
+                    keys=tuple(sorted(keys)),
+                    digest=_digest(path, keys=keys, env=env),
+                    output=output,
+                )
+                dirty = True
+                if current != output:
+                    dest.write_text(text)
+                    copystat(path, dest)
+                    changed.add(dest)
+
+    if dirty or manifest.keys() != stored.keys():
+        _dump_manifest(manifest)
 
+    for dest in sorted(changed):
+        print(f"~ {dest}", file=stderr)
+    return changed
+
+
+def main() -> None:
+    pprn()
+    networks = current_networks()
+    render(networks)
     gen_wg(networks)
-    _gen_keys(networks)
+    gen_keys(networks)
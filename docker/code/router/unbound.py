@@ -0,0 +1,36 @@
+from functools import partial
+from socket import AF_UNIX, SOCK_STREAM, socket
+from typing import Iterator
+
+from .consts import SHORT_DURATION, UNBOUND_SOCK
+
+_VERSION = 1
+_EOF = "\x04"
+_STDIN_OPS = {
+    "local_zones",
+    "local_zones_remove",
+    "local_datas",
+    "local_datas_remove",
+}
+
+
+def _request(op: str, *lines: str) -> Iterator[str]:
+    yield f"UBCT{_VERSION} {op}\n"
+    if op in _STDIN_OPS:
+        for line in lines:
+            yield f"{line}\n"
+        yield f"{_EOF}\n"
+
+
+def ctl(op: str, *lines: str) -> str:
+    req = "".join(_request(op, *lines)).encode()
+    with socket(AF_UNIX, SOCK_STREAM) as sock:
+        sock.settimeout(SHORT_DURATION)
+        sock.connect(str(UNBOUND_SOCK))
+        sock.sendall(req)
+        reply = b"".join(iter(partial(sock.recv, 2**16), b"")).decode()
+
+    if reply.startswith("error"):
+        raise RuntimeError(f"{op} -- {reply.strip()}")
+    else:
+        return reply
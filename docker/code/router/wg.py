@@ -1,22 +1,39 @@
-from dataclasses import dataclass
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, replace
+from functools import lru_cache
 from hashlib import sha256
-from ipaddress import IPv4Interface, IPv6Interface, ip_interface
+from ipaddress import IPv4Interface, IPv6Interface
 from json import dumps, loads
 from locale import strxfrm
-from pathlib import PurePath
+from multiprocessing import cpu_count
+from os import getpid
+from pathlib import Path, PurePath
 from shutil import rmtree
-from subprocess import check_output, run
-from typing import Any, Iterable, Iterator, Mapping, MutableSet, Tuple
-
-from std2.ipaddress import IPInterface
+from subprocess import run
+from typing import (
+    Any,
+    Mapping,
+    MutableMapping,
+    MutableSequence,
+    MutableSet,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+)
+
+from std2.ipaddress import IPAddress, IPNetwork
 from std2.pickle.decoder import new_decoder
 from std2.pickle.encoder import new_encoder
 
+from .alloc import allocator
 from .consts import DATA, J2, QR_DIR
 from .ip import ipv6_enabled
 from .options.parser import settings
 from .render import j2_build, j2_render
 from .types import Networks
+from .x25519 import genkey, genpsk, pubkey
 
 _CLIENT_TPL = PurePath("wg", "client.conf")
 
@@ -24,6 +41,8 @@ _CLIENT_TPL = PurePath("wg", "client.conf")
 _WG_DATA = DATA / "wireguard"
 _SRV_KEY = _WG_DATA / "server.key"
 _CLIENT_KEYS = _WG_DATA / "clients"
+_KEYSTORE = _WG_DATA / "keystore.json"
+_REGISTRY = _WG_DATA / "registry.json"
 
 
 @dataclass(frozen=True)
@@ -44,133 +63,234 @@ class _Client:
     v6: IPv6Interface
 
 
+@dataclass(frozen=True)
+class _Keys:
+    private_key: str
+    public_key: str
+
+
+@dataclass(frozen=True)
+class _PeerKeys(_Keys):
+    shared_key: str
+
+
+@dataclass(frozen=True)
+class _Keystore:
+    server: Optional[_Keys] = None
+    peers: Mapping[str, _PeerKeys] = field(default_factory=dict)
+
+
+@dataclass(frozen=True)
+class _Registry:
+    v4: Mapping[str, int] = field(default_factory=dict)
+    v6: Mapping[str, int] = field(default_factory=dict)
+
+
 _IFS = Tuple[IPv4Interface, IPv6Interface]
+_T = TypeVar("_T")
 
 
-def _srv(networks: Networks) -> _Server:
-    _SRV_KEY.parent.mkdir(parents=True, exist_ok=True)
+def _read(path: Path, tp: Type[_T], default: _T) -> _T:
+    try:
+        json = loads(path.read_text())
+    except FileNotFoundError:
+        return default
+    else:
+        return new_decoder[_T](tp, strict=False)(json)
+
+
+def _write(path: Path, tp: Type[_T], val: _T) -> None:
+    data = new_encoder[_T](tp)(val)
+    json = dumps(data, check_circular=False, ensure_ascii=False, indent=2)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{getpid()}")
+    tmp.write_text(json)
+    tmp.replace(path)
 
-    wg = networks.wireguard
-    v4 = IPv4Interface(f"{next(wg.v4.hosts())}/{wg.v4.max_prefixlen}")
-    v6 = IPv6Interface(f"{next(wg.v6.hosts())}/{wg.v6.max_prefixlen}")
 
-    if not _SRV_KEY.exists():
-        pk = check_output(("wg", "genkey"), text=True).rstrip()
-        _SRV_KEY.write_text(pk)
+def _srv_keys(store: _Keystore) -> _Keys:
+    if store.server:
+        return store.server
+    else:
+        private_key = _SRV_KEY.read_text().strip() if _SRV_KEY.exists() else genkey()
+        return _Keys(private_key=private_key, public_key=pubkey(private_key))
 
-    private_key = _SRV_KEY.read_text()
-    public_key = check_output(("wg", "pubkey"), input=private_key, text=True).rstrip()
 
-    srv = _Server(
-        private_key=private_key,
-        public_key=public_key,
+def _peer_keys(store: _Keystore, peer: str) -> _PeerKeys:
+    if keys := store.peers.get(peer):
+        return keys
+    else:
+        key_p, psk_p = _CLIENT_KEYS / f"{peer}.key", _CLIENT_KEYS / f"{peer}.psk"
+        private_key = key_p.read_text().strip() if key_p.exists() else genkey()
+        shared_key = psk_p.read_text().strip() if psk_p.exists() else genpsk()
+        return _PeerKeys(
+            private_key=private_key,
+            public_key=pubkey(private_key),
+            shared_key=shared_key,
+        )
+
+
+def _legacy_addrs(peer: str) -> Optional[_IFS]:
+    json_p = _CLIENT_KEYS / f"{peer}.json"
+    try:
+        json = loads(json_p.read_text())
+    except FileNotFoundError:
+        return None
+    else:
+        return new_decoder[_IFS](_IFS)(json)
+
+
+@lru_cache(maxsize=1)
+def _names(fingerprint: Tuple[int, int, int]) -> Mapping[str, str]:
+    store = _read(_KEYSTORE, tp=_Keystore, default=_Keystore())
+    return {keys.public_key: peer for peer, keys in store.peers.items()}
+
+
+def peer_names() -> Mapping[str, str]:
+    try:
+        stat = _KEYSTORE.stat()
+    except FileNotFoundError:
+        return {}
+    else:
+        return _names((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+
+
+def _server(networks: Networks, keys: _Keys) -> _Server:
+    wg = networks.wireguard
+    v4 = IPv4Interface(f"{next(wg.v4.hosts())}/{wg.v4.max_prefixlen}")
+    v6 = IPv6Interface(f"{next(wg.v6.hosts())}/{wg.v6.max_prefixlen}")
+    return _Server(
+        private_key=keys.private_key,
+        public_key=keys.public_key,
         v4=v4,
         v6=v6,
     )
-    return srv
-
-
-def _ip_gen(
-    peers: Iterable[str], networks: Networks
-) -> Iterator[Tuple[IPv4Interface, IPv6Interface]]:
-    srv = _srv(networks)
-    wg_v4, wg_v6 = networks.wireguard.v4, networks.wireguard.v6
-    seen: MutableSet[IPInterface] = {
-        ip_interface(f"{wg_v4[0]}/{wg_v4.max_prefixlen}"),
-        ip_interface(f"{wg_v6[0]}/{wg_v6.max_prefixlen}"),
-        ip_interface(f"{wg_v4.broadcast_address}/{wg_v4.max_prefixlen}"),
-        ip_interface(f"{wg_v6.broadcast_address}/{wg_v6.max_prefixlen}"),
-        srv.v4,
-        srv.v6,
-    }
 
-    def end(v4: IPv4Interface, v6: IPv6Interface, write: bool) -> None:
-        seen.add(v4)
-        seen.add(v6)
-        if write:
-            addr_pair = Tuple[IPv4Interface, IPv6Interface]
-            data = new_encoder[addr_pair](addr_pair)((v4, v6))
-            json = dumps(data, check_circular=False, ensure_ascii=False, indent=2)
-            json_p.write_text(json)
 
+def _srv(networks: Networks) -> _Server:
+    store = _read(_KEYSTORE, tp=_Keystore, default=_Keystore())
+    keys = _srv_keys(store)
+    if keys != store.server:
+        _write(_KEYSTORE, tp=_Keystore, val=replace(store, server=keys))
+    return _server(networks, keys=keys)
+
+
+def _assign(
+    network: IPNetwork,
+    reserved: IPAddress,
+    peers: Sequence[str],
+    slots: Mapping[str, int],
+    legacy: Mapping[str, IPAddress],
+) -> Mapping[str, int]:
+    pool = allocator(network)
+    pool.reserve(reserved)
+    pool.reserve(network.broadcast_address)
+    base = int(network.network_address)
+
+    assigned: MutableMapping[str, int] = {}
     for peer in peers:
+        slot = slots.get(peer)
+        addr = (
+            network[slot]
+            if slot is not None and 0 <= slot < network.num_addresses
+            else legacy.get(peer)
+        )
+        if addr is not None and pool.free(addr):
+            pool.reserve(addr)
+            assigned[peer] = int(addr) - base
 
-        def cont() -> _IFS:
+    for peer in peers:
+        if peer not in assigned:
             hashed = int(sha256(peer.encode()).hexdigest(), 16)
-            n4 = hashed % wg_v4.num_addresses
-            n6 = hashed % wg_v6.num_addresses
-            while True:
-                v4 = IPv4Interface(f"{wg_v4[n4]}/{wg_v4.max_prefixlen}")
-                v6 = IPv6Interface(f"{wg_v6[n6]}/{wg_v6.max_prefixlen}")
-
-                if v4 in seen:
-                    n4 = (n4 + 1) % wg_v4.num_addresses
-                if v6 in seen:
-                    n6 = (n6 + 1) % wg_v6.num_addresses
-                if v4 not in seen and v6 not in seen:
-                    return v4, v6
-
-        json_p = _CLIENT_KEYS / f"{peer}.json"
-
-        if json_p.exists():
-            raw = json_p.read_text()
-            json = loads(raw)
-            addrs = new_decoder[_IFS](_IFS)(json)
-            v4, v6 = addrs
-            if v4 not in seen and v6 not in seen and v4 in wg_v4 and v6 in wg_v6:
-                end(v4, v6, write=False)
-                yield v4, v6
-            else:
-                v4, v6 = cont()
-                end(v4, v6, write=True)
-                yield v4, v6
-        else:
-            v4, v6 = cont()
-            end(v4, v6, write=True)
-            yield v4, v6
+            addr = pool.probe(network[hashed % network.num_addresses])
+            pool.reserve(addr)
+            assigned[peer] = int(addr) - base
 
+    return {peer: assigned[peer] for peer in peers}
 
-def clients(networks: Networks) -> Iterator[_Client]:
-    _CLIENT_KEYS.mkdir(parents=True, exist_ok=True)
 
-    wg_peers = sorted(settings().wireguard.peers, key=strxfrm)
-    for peer, (v4, v6) in zip(wg_peers, _ip_gen(wg_peers, networks=networks)):
-        key_p, psk_p = _CLIENT_KEYS / f"{peer}.key", _CLIENT_KEYS / f"{peer}.psk"
+def _addrs(
+    peers: Sequence[str], srv: _Server, networks: Networks
+) -> Mapping[str, _IFS]:
+    wg_v4, wg_v6 = networks.wireguard.v4, networks.wireguard.v6
+    registry = _read(_REGISTRY, tp=_Registry, default=_Registry())
+
+    legacy: MutableMapping[str, _IFS] = {}
+    for peer in peers:
+        if peer not in registry.v4 or peer not in registry.v6:
+            if addrs := _legacy_addrs(peer):
+                legacy[peer] = addrs
+
+    v4_slots = _assign(
+        wg_v4,
+        reserved=srv.v4.ip,
+        peers=peers,
+        slots=registry.v4,
+        legacy={peer: v4.ip for peer, (v4, _) in legacy.items()},
+    )
+    v6_slots = _assign(
+        wg_v6,
+        reserved=srv.v6.ip,
+        peers=peers,
+        slots=registry.v6,
+        legacy={peer: v6.ip for peer, (_, v6) in legacy.items()},
+    )
 
-        if key_p.exists():
-            private_key = key_p.read_text()
-        else:
-            private_key = check_output(("wg", "genkey"), text=True).rstrip()
-            key_p.write_text(private_key)
+    updated = _Registry(v4=v4_slots, v6=v6_slots)
+    if updated != registry:
+        _write(_REGISTRY, tp=_Registry, val=updated)
 
-        if psk_p.exists():
-            shared_key = psk_p.read_text()
-        else:
-            shared_key = check_output(("wg", "genpsk"), text=True).rstrip()
-            psk_p.write_text(shared_key)
+    return {
+        peer: (
+            IPv4Interface(f"{wg_v4[v4_slots[peer]]}/{wg_v4.max_prefixlen}"),
+            IPv6Interface(f"{wg_v6[v6_slots[peer]]}/{wg_v6.max_prefixlen}"),
+        )
+        for peer in peers
+    }
 
-        public_key = check_output(
-            ("wg", "pubkey"), input=private_key, text=True
-        ).rstrip()
 
-        client = _Client(
+def clients(networks: Networks) -> Sequence[_Client]:
+    store = _read(_KEYSTORE, tp=_Keystore, default=_Keystore())
+    srv_keys = _srv_keys(store)
+    srv = _server(networks, keys=srv_keys)
+
+    wg_peers = sorted(settings().wireguard.peers, key=strxfrm)
+    keys = {peer: _peer_keys(store, peer=peer) for peer in wg_peers}
+    addrs = _addrs(wg_peers, srv=srv, networks=networks)
+
+    updated = _Keystore(server=srv_keys, peers={**store.peers, **keys})
+    if updated != store:
+        _write(_KEYSTORE, tp=_Keystore, val=updated)
+
+    return tuple(
+        _Client(
             name=peer,
-            private_key=private_key,
-            public_key=public_key,
-            shared_key=shared_key,
+            private_key=keys[peer].private_key,
+            public_key=keys[peer].public_key,
+            shared_key=keys[peer].shared_key,
             v4=v4,
             v6=v6,
         )
-        yield client
-
+        for peer, (v4, v6) in addrs.items()
+    )
 
-def gen_wg(networks: Networks) -> None:
-    j2 = j2_build(J2)
 
+def _unchanged(conf_path: Path, qr_path: Path, text: str) -> bool:
     try:
-        rmtree(QR_DIR)
+        return qr_path.exists() and conf_path.read_text() == text
     except FileNotFoundError:
-        pass
+        return False
+
+
+def _encode(conf_path: Path, qr_path: Path, text: str) -> None:
+    tmp = qr_path.with_name(f".{qr_path.name}")
+    run(("qrencode", "--output", tmp), check=True, input=text.encode())
+    tmp.replace(qr_path)
+    conf_path.write_text(text)
+
+
+def gen_wg(networks: Networks) -> None:
+    j2 = j2_build(J2)
     QR_DIR.mkdir(parents=True, exist_ok=True)
 
     srv = _srv(networks)
@@ -193,27 +313,42 @@ def gen_wg(networks: Networks) -> None:
         "WG_PORT": settings().port_bindings.wireguard,
     }
 
-    for client in clients(networks):
-        conf_path = (QR_DIR / client.name).with_suffix(".conf")
-        qr_path = (QR_DIR / client.name).with_suffix(".png")
-
-        l_env: Mapping[str, Any] = {
-            "NAME": client.name,
-            "CLIENT_PRIVATE_KEY": client.private_key,
-            "SHARED_KEY": client.shared_key,
-            "CLIENT_ADDR_V4": client.v4,
-            "CLIENT_ADDR_V6": client.v6,
-        }
-        env = {**l_env, **g_env}
-        text = j2_render(j2, path=_CLIENT_TPL, env=env)
-        conf_path.write_text(text)
-
-        run(("qrencode", "--output", qr_path), check=True, input=text.encode())
+    wanted: MutableSet[Path] = set()
+    with ThreadPoolExecutor(max_workers=cpu_count()) as pool:
+        futs: MutableSequence[Future[None]] = []
+        for client in clients(networks):
+            conf_path = (QR_DIR / client.name).with_suffix(".conf")
+            qr_path = (QR_DIR / client.name).with_suffix(".png")
+            wanted.update((conf_path, qr_path))
+
+            l_env: Mapping[str, Any] = {
+                "NAME": client.name,
+                "CLIENT_PRIVATE_KEY": client.private_key,
+                "SHARED_KEY": client.shared_key,
+                "CLIENT_ADDR_V4": client.v4,
+                "CLIENT_ADDR_V6": client.v6,
+            }
+            env = {**l_env, **g_env}
+            text = j2_render(j2, path=_CLIENT_TPL, env=env)
+
+            if not _unchanged(conf_path, qr_path=qr_path, text=text):
+                fut = pool.submit(_encode, conf_path, qr_path=qr_path, text=text)
+                futs.append(fut)
+
+        for fut in as_completed(futs):
+            fut.result()
+
+    for path in QR_DIR.iterdir():
+        if path not in wanted:
+            if path.is_dir():
+                rmtree(path)
+            else:
+                path.unlink(missing_ok=True)
 
 
 def wg_env(networks: Networks) -> Mapping[str, Any]:
     srv = _srv(networks)
-    peers = (
+    peers = tuple(
         {
             "NAME": client.name,
             "PUBLIC_KEY": client.public_key,
@@ -0,0 +1,257 @@
+from base64 import b64decode, b64encode
+from dataclasses import dataclass, replace
+from ipaddress import IPv4Address, IPv6Address, ip_network
+from socket import AF_INET, AF_INET6
+from struct import Struct
+from typing import Iterator, MutableMapping, Optional, Sequence
+
+from std2.ipaddress import IPNetwork
+
+from .netlink import (
+    NETLINK_GENERIC,
+    U8,
+    U16,
+    U32,
+    U64,
+    attr,
+    attr_list,
+    attrs,
+    cstr,
+    genl_family,
+    genl_request,
+    nested,
+    open_netlink,
+)
+
+_WG_GENL_NAME = "wireguard"
+_WG_GENL_VERSION = 1
+_WG_CMD_GET_DEVICE = 0
+_WG_CMD_SET_DEVICE = 1
+
+_WGDEVICE_A_IFNAME = 2
+_WGDEVICE_A_PRIVATE_KEY = 3
+_WGDEVICE_A_PUBLIC_KEY = 4
+_WGDEVICE_A_LISTEN_PORT = 6
+_WGDEVICE_A_PEERS = 8
+
+_WGPEER_A_PUBLIC_KEY = 1
+_WGPEER_A_PRESHARED_KEY = 2
+_WGPEER_A_FLAGS = 3
+_WGPEER_A_ENDPOINT = 4
+_WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL = 5
+_WGPEER_A_LAST_HANDSHAKE_TIME = 6
+_WGPEER_A_RX_BYTES = 7
+_WGPEER_A_TX_BYTES = 8
+_WGPEER_A_ALLOWEDIPS = 9
+
+_WGALLOWEDIP_A_FAMILY = 1
+_WGALLOWEDIP_A_IPADDR = 2
+_WGALLOWEDIP_A_CIDR_MASK = 3
+
+_WGPEER_F_REMOVE_ME = 0x1
+_WGPEER_F_REPLACE_ALLOWEDIPS = 0x2
+
+_PEERS_PER_MSG = 64
+
+_TIMESPEC = Struct("=qq")
+_PORT = Struct("!H")
+
+
+@dataclass(frozen=True)
+class Peer:
+    public_key: str
+    preshared_key: Optional[str]
+    endpoint: Optional[str]
+    last_handshake: float
+    rx_bytes: int
+    tx_bytes: int
+    keepalive: int
+    allowed_ips: Sequence[IPNetwork]
+
+
+@dataclass(frozen=True)
+class Device:
+    ifname: str
+    private_key: Optional[str]
+    public_key: Optional[str]
+    listen_port: int
+    peers: Sequence[Peer]
+
+
+@dataclass(frozen=True)
+class PeerConf:
+    public_key: str
+    preshared_key: Optional[str]
+    allowed_ips: Sequence[IPNetwork]
+
+
+def _u(fmt: Struct, raw: Optional[bytes]) -> int:
+    if raw:
+        (val,) = fmt.unpack_from(raw)
+        return val
+    else:
+        return 0
+
+
+def _key(raw: Optional[bytes]) -> Optional[str]:
+    return b64encode(raw).decode() if raw and any(raw) else None
+
+
+def _endpoint(raw: Optional[bytes]) -> Optional[str]:
+    family = _u(U16, raw)
+    if raw and family == AF_INET:
+        port = _u(_PORT, raw[2:])
+        return f"{IPv4Address(raw[4:8])}:{port}"
+    elif raw and family == AF_INET6:
+        port = _u(_PORT, raw[2:])
+        return f"[{IPv6Address(raw[8:24])}]:{port}"
+    else:
+        return None
+
+
+def _allowed_ips(raw: bytes) -> Sequence[IPNetwork]:
+    def cont() -> Iterator[IPNetwork]:
+        for _, entry in attr_list(raw):
+            fields = attrs(entry)
+            family = _u(U16, fields.get(_WGALLOWEDIP_A_FAMILY))
+            addr = fields.get(_WGALLOWEDIP_A_IPADDR, b"")
+            cidr = _u(U8, fields.get(_WGALLOWEDIP_A_CIDR_MASK))
+            if family == AF_INET:
+                yield ip_network(f"{IPv4Address(addr)}/{cidr}", strict=False)
+            elif family == AF_INET6:
+                yield ip_network(f"{IPv6Address(addr)}/{cidr}", strict=False)
+
+    return tuple(cont())
+
+
+def _peer(raw: bytes) -> Peer:
+    fields = attrs(raw)
+    sec, nsec = _TIMESPEC.unpack(
+        fields.get(_WGPEER_A_LAST_HANDSHAKE_TIME, bytes(_TIMESPEC.size))
+    )
+    return Peer(
+        public_key=_key(fields.get(_WGPEER_A_PUBLIC_KEY)) or "",
+        preshared_key=_key(fields.get(_WGPEER_A_PRESHARED_KEY)),
+        endpoint=_endpoint(fields.get(_WGPEER_A_ENDPOINT)),
+        last_handshake=sec + nsec / 1e9,
+        rx_bytes=_u(U64, fields.get(_WGPEER_A_RX_BYTES)),
+        tx_bytes=_u(U64, fields.get(_WGPEER_A_TX_BYTES)),
+        keepalive=_u(U16, fields.get(_WGPEER_A_PERSISTENT_KEEPALIVE_INTERVAL)),
+        allowed_ips=_allowed_ips(fields.get(_WGPEER_A_ALLOWEDIPS, b"")),
+    )
+
+
+def device(ifname: str) -> Device:
+    private_key: Optional[str] = None
+    public_key: Optional[str] = None
+    listen_port = 0
+    peers: MutableMapping[str, Peer] = {}
+
+    with open_netlink(NETLINK_GENERIC) as sock:
+        family = genl_family(sock, name=_WG_GENL_NAME)
+        payload = attr(_WGDEVICE_A_IFNAME, ifname.encode() + b"\0")
+        for body in genl_request(
+            sock,
+            family=family,
+            cmd=_WG_CMD_GET_DEVICE,
+            version=_WG_GENL_VERSION,
+            payload=payload,
+            dump=True,
+        ):
+            fields = attrs(body)
+            ifname = cstr(fields.get(_WGDEVICE_A_IFNAME, ifname.encode()))
+            private_key = _key(fields.get(_WGDEVICE_A_PRIVATE_KEY)) or private_key
+            public_key = _key(fields.get(_WGDEVICE_A_PUBLIC_KEY)) or public_key
+            listen_port = _u(U16, fields.get(_WGDEVICE_A_LISTEN_PORT)) or listen_port
+
+            for _, entry in attr_list(fields.get(_WGDEVICE_A_PEERS, b"")):
+                peer = _peer(entry)
+                if prev := peers.get(peer.public_key):
+                    allowed_ips = (*prev.allowed_ips, *peer.allowed_ips)
+                    peers[peer.public_key] = replace(prev, allowed_ips=allowed_ips)
+                else:
+                    peers[peer.public_key] = peer
+
+    return Device(
+        ifname=ifname,
+        private_key=private_key,
+        public_key=public_key,
+        listen_port=listen_port,
+        peers=tuple(peers.values()),
+    )
+
+
+def _allowed_ip(network: IPNetwork) -> bytes:
+    family = AF_INET if network.version == 4 else AF_INET6
+    return nested(
+        0,
+        attr(_WGALLOWEDIP_A_FAMILY, U16.pack(family))
+        + attr(_WGALLOWEDIP_A_IPADDR, network.network_address.packed)
+        + attr(_WGALLOWEDIP_A_CIDR_MASK, U8.pack(network.prefixlen)),
+    )
+
+
+def _upsert(peer: PeerConf) -> bytes:
+    psk = b64decode(peer.preshared_key) if peer.preshared_key else bytes(32)
+    allowed_ips = b"".join(map(_allowed_ip, peer.allowed_ips))
+    return nested(
+        0,
+        attr(_WGPEER_A_PUBLIC_KEY, b64decode(peer.public_key))
+        + attr(_WGPEER_A_FLAGS, U32.pack(_WGPEER_F_REPLACE_ALLOWEDIPS))
+        + attr(_WGPEER_A_PRESHARED_KEY, psk)
+        + nested(_WGPEER_A_ALLOWEDIPS, allowed_ips),
+    )
+
+
+def _remove(public_key: str) -> bytes:
+    return nested(
+        0,
+        attr(_WGPEER_A_PUBLIC_KEY, b64decode(public_key))
+        + attr(_WGPEER_A_FLAGS, U32.pack(_WGPEER_F_REMOVE_ME)),
+    )
+
+
+def set_device(
+    ifname: str,
+    private_key: Optional[str],
+    listen_port: Optional[int],
+    upsert: Sequence[PeerConf],
+    remove: Sequence[str],
+) -> None:
+    peers = (*map(_remove, remove), *map(_upsert, upsert))
+    chunks = [
+        peers[idx : idx + _PEERS_PER_MSG]
+        for idx in range(0, len(peers), _PEERS_PER_MSG)
+    ]
+
+    head = attr(_WGDEVICE_A_IFNAME, ifname.encode() + b"\0")
+    dev = b"".join(
+        (
+            attr(_WGDEVICE_A_PRIVATE_KEY, b64decode(private_key))
+            if private_key
+            else b"",
+            attr(_WGDEVICE_A_LISTEN_PORT, U16.pack(listen_port))
+            if listen_port is not None
+            else b"",
+        )
+    )
+
+    with open_netlink(NETLINK_GENERIC) as sock:
+        family = genl_family(sock, name=_WG_GENL_NAME)
+        for idx, chunk in enumerate(chunks or ((),)):
+            payload = b"".join(
+                (
+                    head,
+                    b"" if idx else dev,
+                    nested(_WGDEVICE_A_PEERS, b"".join(chunk)) if chunk else b"",
+                )
+            )
+            for _ in genl_request(
+                sock,
+                family=family,
+                cmd=_WG_CMD_SET_DEVICE,
+                version=_WG_GENL_VERSION,
+                payload=payload,
+                dump=False,
+            ):
+                pass
@@ -1,50 +1,28 @@
+from argparse import ArgumentParser, Namespace
 from subprocess import check_call
+from sys import stderr
+from typing import Any, Iterator, Mapping, MutableSequence, Sequence
 
+from ..batch import Cmd, batch
 from ..consts import RUN
 from ..ifup.main import if_up
-from ..ip import addr_show, link_show
+from ..ip import Addr, addr_show, invalidate, ipv6_enabled, link_show
 from ..options.parser import settings
 from ..subnets import load_networks
+from ..types import Networks
+from ..wg import wg_env
+from ..wgnl import PeerConf, device, set_device
 
 _SRV_CONF = RUN / "wireguard" / "server.conf"
 
 
-def _add_link() -> None:
-    if settings().interfaces.wireguard not in link_show("wireguard"):
-        check_call(
-            (
-                "ip",
-                "link",
-                "replace",
-                settings().interfaces.wireguard,
-                "type",
-                "wireguard",
-            )
-        )
+def _add_link() -> Iterator[Cmd]:
+    yield "link", "replace", settings().interfaces.wireguard, "type", "wireguard"
 
 
-def _set_up() -> None:
-    check_call(
-        (
-            "ip",
-            "link",
-            "set",
-            "multicast",
-            "on",
-            "dev",
-            settings().interfaces.wireguard,
-        )
-    )
-    check_call(
-        (
-            "ip",
-            "link",
-            "set",
-            "up",
-            "dev",
-            settings().interfaces.wireguard,
-        )
-    )
+def _set_up() -> Iterator[Cmd]:
+    yield "link", "set", "multicast", "on", "dev", settings().interfaces.wireguard
+    yield "link", "set", "up", "dev", settings().interfaces.wireguard
 
 
 def _wg_up() -> None:
@@ -58,14 +36,86 @@ def _wg_up() -> None:
     )
 
 
-def main() -> None:
-    networks = load_networks()
-    addrs = addr_show()
-    _add_link()
-    if_up(
-        addrs,
-        interfaces=(settings().interfaces.wireguard,),
-        networks={networks.wireguard.v4, networks.wireguard.v6},
+def _wanted(env: Mapping[str, Any]) -> Mapping[str, PeerConf]:
+    v6 = ipv6_enabled()
+    return {
+        peer["PUBLIC_KEY"]: PeerConf(
+            public_key=peer["PUBLIC_KEY"],
+            preshared_key=peer["SHARED_KEY"],
+            allowed_ips=(
+                peer["V4_ADDR"].network,
+                *((peer["V6_ADDR"].network,) if v6 else ()),
+            ),
+        )
+        for peer in env["PEERS"]
+    }
+
+
+def _sync() -> None:
+    wg_if = settings().interfaces.wireguard
+    env = wg_env(load_networks())
+    wanted = _wanted(env)
+    live = device(wg_if)
+    existing = {peer.public_key: peer for peer in live.peers}
+
+    remove = tuple(key for key in existing if key not in wanted)
+    upsert = tuple(
+        conf
+        for key, conf in wanted.items()
+        if not (peer := existing.get(key))
+        or peer.preshared_key != conf.preshared_key
+        or {*peer.allowed_ips} != {*conf.allowed_ips}
+    )
+    private_key = env["SERVER_PRIVATE_KEY"]
+    listen_port = env["PORT"]
+
+    set_device(
+        wg_if,
+        private_key=None if live.private_key == private_key else private_key,
+        listen_port=None if live.listen_port == listen_port else listen_port,
+        upsert=upsert,
+        remove=remove,
+    )
+
+    added = sum(1 for conf in upsert if conf.public_key not in existing)
+    print(
+        f"{wg_if} :: +{added} ~{len(upsert) - added} -{len(remove)}",
+        file=stderr,
     )
+
+
+def _parse_args(args: Sequence[str]) -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument("action", nargs="?", choices=("up", "sync"), default="up")
+    return parser.parse_args(args)
+
+
+def up(networks: Networks) -> None:
+    wg_if = settings().interfaces.wireguard
+    addrs: MutableSequence[Addr] = [*addr_show()]
+    cmds: MutableSequence[Cmd] = []
+
+    if wg_if not in link_show("wireguard"):
+        cmds.extend(_add_link())
+        addrs.append(Addr(ifname=wg_if, addr_info=()))
+
+    cmds.extend(
+        if_up(
+            addrs,
+            interfaces=(wg_if,),
+            networks={networks.wireguard.v4, networks.wireguard.v6},
+        )
+    )
+    cmds.extend(_set_up())
+
+    batch("ip", cmds=cmds)
+    invalidate()
     _wg_up()
-    _set_up()
+
+
+def main(argv: Sequence[str]) -> None:
+    args = _parse_args(argv)
+    if args.action == "sync":
+        _sync()
+    else:
+        up(load_networks())
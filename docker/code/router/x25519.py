@@ -0,0 +1,59 @@
+from base64 import b64decode, b64encode
+from functools import lru_cache
+from secrets import token_bytes
+
+_P = 2**255 - 19
+_A24 = 121665
+_BASE = 9
+_KEY_LEN = 32
+
+
+def _clamp(raw: bytes) -> bytes:
+    clamped = bytearray(raw)
+    clamped[0] &= 248
+    clamped[31] &= 127
+    clamped[31] |= 64
+    return bytes(clamped)
+
+
+def _ladder(scalar: int, u: int) -> int:
+    x1, x2, z2, x3, z3 = u, 1, 0, u, 1
+    swap = 0
+    for t in reversed(range(255)):
+        bit = (scalar >> t) & 1
+        swap ^= bit
+        if swap:
+            x2, x3, z2, z3 = x3, x2, z3, z2
+        swap = bit
+
+        a, b = x2 + z2, x2 - z2
+        c, d = x3 + z3, x3 - z3
+        aa, bb = a * a % _P, b * b % _P
+        e = aa - bb
+        da, cb = d * a % _P, c * b % _P
+        x3, z3 = (da + cb) ** 2 % _P, x1 * (da - cb) ** 2 % _P
+        x2, z2 = aa * bb % _P, e * (aa + _A24 * e) % _P
+
+    if swap:
+        x2, z2 = x3, z3
+    return x2 * pow(z2, _P - 2, _P) % _P
+
+
+def x25519(scalar: bytes, u: bytes) -> bytes:
+    k = int.from_bytes(_clamp(scalar), "little")
+    x = int.from_bytes(u, "little") & ((1 << 255) - 1)
+    return _ladder(k, x).to_bytes(_KEY_LEN, "little")
+
+
+def genkey() -> str:
+    return b64encode(_clamp(token_bytes(_KEY_LEN))).decode()
+
+
+def genpsk() -> str:
+    return b64encode(token_bytes(_KEY_LEN)).decode()
+
+
+@lru_cache(maxsize=None)
+def pubkey(private_key: str) -> str:
+    base = _BASE.to_bytes(_KEY_LEN, "little")
+    return b64encode(x25519(b64decode(private_key), u=base)).decode()
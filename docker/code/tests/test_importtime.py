@@ -0,0 +1,62 @@
+from os import environ
+from pathlib import Path
+from subprocess import run
+from sys import executable
+from textwrap import dedent
+from typing import Iterator, Tuple
+from unittest import TestCase
+
+_CODE = Path(__file__).resolve().parent.parent
+_ARGV = ("router", "domains", "tftp", "00:00:00:00:00:00", "127.0.0.1")
+_FORBIDDEN = ("router.stats", "router.cake", "jinja2")
+_BUDGET_MS = 200
+
+_PROG = dedent(
+    f"""
+    from runpy import run_module
+    from sys import argv
+
+    argv[:] = {_ARGV!r}
+    run_module("router", run_name="__main__")
+    """
+)
+
+
+def _imports(stderr: str) -> Iterator[Tuple[str, int, bool]]:
+    for line in stderr.splitlines():
+        lhs, sep, rest = line.partition("import time:")
+        if not lhs and sep:
+            _, cumulative, name = rest.split("|")
+            top_level = len(name) - len(name.lstrip()) == 1
+            if cumulative.strip().isdigit():
+                yield name.strip(), int(cumulative), top_level
+
+
+class ImportTime(TestCase):
+    def test_domains(self) -> None:
+        env = {**environ, "USER": environ.get("USER", "root")}
+        proc = run(
+            (executable, "-X", "importtime", "-c", _PROG),
+            cwd=_CODE,
+            env=env,
+            text=True,
+            capture_output=True,
+        )
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+        imports = tuple(_imports(proc.stderr))
+        for name, _, _ in imports:
+            for forbidden in _FORBIDDEN:
+                self.assertFalse(
+                    name == forbidden or name.startswith(f"{forbidden}."),
+                    f"{name} imported by router domains",
+                )
+
+        top = sorted(
+            ((name, us) for name, us, top_level in imports if top_level),
+            key=lambda pair: pair[1],
+            reverse=True,
+        )
+        total = sum(us for _, us in top) // 1000
+        slowest = ", ".join(f"{name}={us // 1000}ms" for name, us in top[:10])
+        self.assertLessEqual(total, _BUDGET_MS, slowest)
@@ -0,0 +1,10 @@
+#!/usr/bin/env bash
+
+set -Eeu
+set -o pipefail
+export PATH="/usr/local/bin:/usr/sbin:$PATH"
+
+
+/venv/bin/python3 -m router boot
+chown -R -- "$USER:$USER" /srv /data
+exec -- chown -R -- root:root /srv/run/sudo